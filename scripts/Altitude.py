@@ -0,0 +1,81 @@
+"""
+Minimum safe altitude profile of a route (terrain following).
+    The lowest altitudes (meters above sea level) per trackpoint which stay a clearance above
+    the terrain and respect the maximum climb and descent rates of the drone:
+        forward sweep: descend no faster than the descent rate after high terrain,
+        backward sweep: start climbing early enough for the climb rate before high terrain.
+    Each sweep is a running maximum (NumPy accumulate), linear time, no Python loop.
+"""
+
+# packages
+from Route import MPSEC, EARTHRADIUS, get_central_angle
+import numpy as np
+
+# constants
+CLEARANCE = 50 # meters above the terrain (DSM)
+CLIMBRATE = 5 # meters per second
+DESCENTRATE = 5 # meters per second
+
+
+# functions ========
+
+def get_safe_altitudes(elevations, spacing, clearance=CLEARANCE, climb_rate=CLIMBRATE,
+                       descent_rate=DESCENTRATE, speed=MPSEC, out=None, work=None):
+    """
+    Get the minimum safe altitude profile (meters above sea level) of a track
+    elevations: terrain elevations of the trackpoints (meters, NumPy array or sequence)
+    spacing: meters between consecutive trackpoints, scalar or array (trackpoints - 1)
+    speed: ground speed in meters per second (climb and descent per meter flown)
+    out, work: optional float64 arrays (trackpoints), reused by repeated calls (no allocation)
+    :return NumPy float64 array (out), commanded altitude per trackpoint
+    """
+    if climb_rate <= 0 or descent_rate <= 0:
+        raise ValueError("Altitude: climb and descent rates must be positive")
+    count = len(elevations)
+    out = np.empty(count) if out is None else out
+    work = np.empty(count) if work is None else work
+    if count == 0:
+        return out
+    # work: flight time from the first trackpoint (seconds)
+    work[0] = 0.0
+    np.cumsum(np.broadcast_to(np.divide(spacing, speed), (count - 1,)), out=work[1:])
+    np.add(elevations, clearance, out=out)
+    # forward: a[i] >= a[j] - descent*(t[i] - t[j]) for j < i
+    work *= descent_rate
+    out += work
+    np.maximum.accumulate(out, out=out)
+    out -= work
+    # backward: a[i] >= a[j] - climb*(t[j] - t[i]) for j > i
+    work *= climb_rate/descent_rate
+    out -= work
+    np.maximum.accumulate(out[::-1], out=out[::-1])
+    out += work
+    return out
+
+def get_track_spacing(lats, longs):
+    """
+    Get the meters between consecutive trackpoints (haversine)
+    :return NumPy float64 array (trackpoints - 1)
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    longs = np.asarray(longs, dtype=np.float64)
+    return EARTHRADIUS*get_central_angle(lats[:-1], longs[:-1], lats[1:], longs[1:])
+
+def get_route_altitudes(dbcache, route, **kwargs):
+    """
+    Get the minimum safe altitude profile of a route (see Route.build_route),
+    with the elevations of the trackpoints from a Dbcache (or Mmcache),
+    kwargs: see get_safe_altitudes
+    :return NumPy float64 array, commanded altitude per trackpoint
+    """
+    if not route["tracks"]:
+        return np.empty(0)
+    lats, longs = np.asarray(route["tracks"], dtype=np.float64).T
+    elevations = dbcache.get_elevations(lats, longs)
+    return get_safe_altitudes(elevations, get_track_spacing(lats, longs), **kwargs)
+
+
+# main ========
+
+if __name__ == '__main__':
+    print("This Altitude module shall not be invoked on it's own.")
@@ -0,0 +1,76 @@
+"""
+Codecs for the elevation blobs (rows or chunks) in the database.
+    Elevations are big endian int16, neighbouring cells differ by a few meters:
+    a delta filter (predictor) turns a block into small values, which zlib or lzma
+    compress well. The codec of a database is stored in its settings table.
+        raw: 2 bytes per cell, no compression
+        zlib, lzma: compression only
+        delta+zlib, delta+lzma: delta filter (int16, wrap around), then compression
+"""
+
+# packages ========
+
+import lzma
+import zlib
+import numpy as np
+
+# constants ========
+
+CODEC_RAW = "raw"
+CODEC_ZLIB = "zlib"
+CODEC_LZMA = "lzma"
+CODEC_DELTA_ZLIB = "delta+zlib"
+CODEC_DELTA_LZMA = "delta+lzma"
+CODECS = (CODEC_RAW, CODEC_ZLIB, CODEC_LZMA, CODEC_DELTA_ZLIB, CODEC_DELTA_LZMA)
+ZLIB_LEVEL = 6
+LZMA_PRESET = 6
+
+# functions ========
+
+def check_codec(codec):
+    """
+    raise ValueError for unknown codecs
+    """
+    if codec not in CODECS:
+        raise ValueError("Codec: unknown codec '" + str(codec) + "', use one of " + str(CODECS))
+
+def encode(codec, data):
+    """
+    encode one block, data: bytes (big endian int16) or NumPy array with elevations
+    :return bytes
+    """
+    check_codec(codec)
+    values = np.ascontiguousarray(data, dtype=">i2") if isinstance(data, np.ndarray) \
+        else np.frombuffer(data, dtype=">i2")
+    if codec == CODEC_RAW:
+        return values.tobytes()
+    if codec.startswith("delta+"):
+        # first value, then differences (int16 arithmetic wraps around, cumsum undoes it)
+        values = np.diff(values.reshape(-1).astype(np.int16), prepend=np.int16(0)).astype(">i2")
+    raw = values.tobytes()
+    if codec.endswith("zlib"):
+        return zlib.compress(raw, ZLIB_LEVEL)
+    return lzma.compress(raw, preset=LZMA_PRESET)
+
+def decode(codec, blob):
+    """
+    decode one block, blob: bytes from encode
+    :return bytes (big endian int16)
+    """
+    check_codec(codec)
+    if codec == CODEC_RAW:
+        return bytes(blob)
+    if codec.endswith("zlib"):
+        raw = zlib.decompress(blob)
+    else:
+        raw = lzma.decompress(blob)
+    if codec.startswith("delta+"):
+        deltas = np.frombuffer(raw, dtype=">i2").astype(np.int16)
+        raw = np.cumsum(deltas, dtype=np.int16).astype(">i2").tobytes()
+    return raw
+
+
+# main ========
+
+if __name__ == '__main__':
+    print("This Codec module shall not be invoked on it's own.")
@@ -1,17 +1,27 @@
 """
-Cache for rows of elevations, in order to speed up 'nearest_neighbour' queries
+Cache for rows (or chunks, see Dbsql layout) of elevations, in order to speed up 'nearest_neighbour' queries
+Rows and chunks are cached decoded (see Codec), compressed blobs are decompressed once per cache miss
 Contains also other variables apart from matrix rows
 """
 
 # packages
 from Dbsql import Dbsql
+from Raster import VOID
+from Codec import CODEC_RAW
+from Prefetcher import Prefetcher
+from Route import MPSEC
 import json
 import logging
 import math
+import numpy as np
+from collections import OrderedDict
 from math import radians, sin, cos, acos
 
 # constants
-MAXLENCACHE = 10 # max number of items in the cache
+MAXCACHEBYTES = 16*1024*1024 # default byte budget of the cache (rows or chunks, decoded)
+WINDOWREADS = 2 # point reads of a block (blob I/O) before the whole block is read and cached
+MAXWINDOWKEYS = 1024 # blocks with point reads, tracked for the access pattern
+METERSPERDEGREE = 6371010 * math.pi / 180 # meters per degree latitude
 NEXTCELLS = {
     "NW":(1,-1), "N":(1,0), "NE":(1,1), 
     "W":(0,-1), "E":(0,1), 
@@ -21,24 +31,53 @@ NEXTCELLS = {
 
 class Dbcache:
     
-    def __init__(self, dbpath):
+    def __init__(self, dbpath, cache_bytes=MAXCACHEBYTES, window_reads=WINDOWREADS,
+                 prefetch_seconds=0, prefetch_speed=MPSEC):
         """
         Initialize the SQL cache
+        cache_bytes: byte budget of the LRU cache, at least one row (or chunk) is kept
+        window_reads: point reads of a block before the whole block is cached,
+            0: always read and cache whole blocks
+        prefetch_seconds: look-ahead of the prefetcher (get_flight_information), 0 is no prefetching
+        prefetch_speed: speed of the drone in meters per second, for the look-ahead distance
         """
-        self.dbsql = Dbsql(dbpath)
-        self.row_headers = self.dbsql.get_row_headers()
-        self.col_headers = self.dbsql.get_col_headers()
-        self.bounding_box = self.dbsql.get_arena_bounding_box()
-        self.row_span = round(self.bounding_box['top']-self.bounding_box['bottom']) # floating var
-        self.row_len = len(self.row_headers)                                        # integer var
-        self.row_fctr = self.row_len/self.row_span                                  # multiplication factor
-        self.col_span = round(self.bounding_box['right']-self.bounding_box['left']) # floating var
-        self.col_len = len(self.col_headers)                                        # integer var
-        self.col_fctr = self.col_len/self.col_span                                  # multiplication factor 
-        self.cache = {}                                                             # dictionary with unpickeled rows
-        self.last_position = None                                                   # tuple (lat, long) or None
+        self.dbsql = Dbsql(dbpath, readonly=True)
+        self._init_arena(self.dbsql.get_geotransform(), self.dbsql.get_shape(),
+                         self.dbsql.get_arena_bounding_box(), self.dbsql.get_overview_levels())
+        prefetch_distance = prefetch_seconds*prefetch_speed
+        self._init_cache(cache_bytes, window_reads, prefetch_distance,
+                         Prefetcher(dbpath) if prefetch_distance > 0 else None)
         pass
 
+    def _init_arena(self, geotransform, shape, bounding_box, overview_levels):
+        """
+        Initialize the arena geometry (shared by the cache backends, see Mmcache)
+        """
+        self.geotransform = geotransform                                            # tuple (GDAL style)
+        self.row_len, self.col_len = shape                                          # integer vars
+        self.bounding_box = bounding_box                                            # cell centers
+        self.row_fctr = 1/self.geotransform[5]                                      # multiplication factor (negative)
+        self.col_fctr = 1/self.geotransform[1]                                      # multiplication factor 
+        self.overview_levels = overview_levels                                      # list, ascending
+        self.full_scan_logged = False                                               # corridor without overviews
+
+    def _init_cache(self, cache_bytes, window_reads, prefetch_distance, prefetcher):
+        """
+        Initialize the cache, its statistics and the prefetcher (shared by the cache backends)
+        """
+        self.cache = OrderedDict()                                                  # rows or chunks (memoryviews), least recently used first
+        self.cache_bytes = cache_bytes                                              # byte budget
+        self.cached_bytes = 0                                                       # bytes in the cache
+        self.hits = 0                                                               # cache statistics
+        self.misses = 0
+        self.evictions = 0
+        self.point_reads = 0
+        self.window_reads = window_reads                                            # access pattern
+        self.window_keys = OrderedDict()                                            # point reads per block
+        self.prefetch_distance = prefetch_distance                                  # look-ahead in meters
+        self.prefetcher = prefetcher
+        self.last_position = None                                                   # tuple (lat, long) or None
+
     # context manager ========
 
     def __enter__(self):
@@ -51,7 +90,9 @@ class Dbcache:
         """ 
         context manager: end of session 
         """
-        # close database
+        # stop prefetcher, close database
+        if self.prefetcher:
+            self.prefetcher.stop()
         del self.dbsql
 
     # validate ========
@@ -74,55 +115,133 @@ class Dbcache:
         """
         convert geoposition (lat, long) to array dimensions (row, col)
         """
-        rowId = round((self.bounding_box['top'] - lat)*self.row_fctr)
-        colId = round((long - self.bounding_box['left'])*self.col_fctr)
+        rowId = math.floor((lat - self.geotransform[3])*self.row_fctr)
+        colId = math.floor((long - self.geotransform[0])*self.col_fctr)
         return rowId, colId
 
     # cache ========
 
-    def _getRowFromCache(self, rowId):
+    def _getRowFromCache(self, key):
         """
-        get row[rowId] from the cache, else row is empty
+        get row[key] (or chunk[key]) from the cache and mark it as most recently used, else row is empty
         """
-        if rowId in self.cache:
-            return self.cache[rowId] # list with values
+        if key in self.cache:
+            self.cache.move_to_end(key) # most recently used
+            self.hits += 1
+            return self.cache[key] # list with values
+        block = self.prefetcher.take(key) if self.prefetcher else None
+        if block is not None:
+            # read ahead by the prefetcher
+            self._addRowToCache(key, block)
+            self.hits += 1
+            return block
         else:
+            self.misses += 1
             return [] # empty list
         
-    def _addRowToCache(self, rowId, row):
+    def _addRowToCache(self, key, row):
         """
-        add row[rowId] to the cache 
+        add row[key] (or chunk[key]) to the cache, evict least recently used items beyond the byte budget
         """
-        self.cache[rowId] = row
-        if len(self.cache) > MAXLENCACHE:
-            # delete oldest item from the cache
-            oldest = next(iter(self.cache)) # ordered, needs Python version 3.7+
-            del self.cache[oldest]
+        if key in self.cache:
+            self.cached_bytes -= len(self.cache[key])
+        self.cache[key] = row
+        self.cache.move_to_end(key)
+        self.cached_bytes += len(row)
+        while self.cached_bytes > self.cache_bytes and len(self.cache) > 1:
+            # delete least recently used item from the cache
+            oldest, oldest_row = self.cache.popitem(last=False)
+            self.cached_bytes -= len(oldest_row)
+            self.evictions += 1
         pass        
 
-    def _get_either_row(self, rowId):
+    def _get_either_row(self, key):
         """
-        get row[rowId] from either the cache or the database
+        get row[key] (or chunk[key], see Dbsql.locate) from either the cache or the database
         """
-        rslt = self._getRowFromCache(rowId)
+        rslt = self._getRowFromCache(key)
         if not rslt: # empty cache
-            rslt = self.dbsql.get_row(rowId)
-            self._addRowToCache(rowId, rslt)
+            rslt = self.dbsql.get_block(key)
+            self._addRowToCache(key, rslt)
         return rslt
 
+    def _get_cell(self, key, offset):
+        """
+        get the 2 bytes of one cell at offset of row[key] (or chunk[key]), from the cache,
+        else from the database: point read (blob I/O) for blocks read rarely,
+        whole block (cached) once a block was read window_reads times
+        """
+        row = self._getRowFromCache(key)
+        if row:
+            return row[offset:offset+2]
+        reads = self.window_keys.pop(key, 0)
+        if reads >= self.window_reads or self.dbsql.codec != CODEC_RAW:
+            row = self.dbsql.get_block(key)
+            self._addRowToCache(key, row)
+            return row[offset:offset+2]
+        self.window_keys[key] = reads + 1 # most recently read
+        if len(self.window_keys) > MAXWINDOWKEYS:
+            self.window_keys.popitem(last=False)
+        self.point_reads += 1
+        return self.dbsql.get_window(key, offset, 2)
+
+    def get_cache_statistics(self):
+        """
+        get the cache statistics, to size the cache (cache_bytes) for the routes
+        :return dictionary
+        """
+        lookups = self.hits + self.misses
+        statistics = {
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "point_reads": self.point_reads,
+            "hit_rate": self.hits/lookups if lookups else 0.0,
+            "items": len(self.cache), "bytes": self.cached_bytes, "budget": self.cache_bytes
+        }
+        if self.prefetcher:
+            statistics["prefetch"] = self.prefetcher.get_statistics()
+        return statistics
+
+    def _prefetch(self, lat, long, compass):
+        """
+        request the rows (or chunks) on the path ahead, from (lat, long) in the compass direction,
+        up to the look-ahead distance, sampled every half cell, nearest first
+        """
+        step = abs(self.geotransform[5])*METERSPERDEGREE/2 # meters
+        heading = radians(compass)
+        dlat = step*cos(heading)/METERSPERDEGREE
+        dlong = step*sin(heading)/(METERSPERDEGREE*cos(radians(lat)))
+        keys = []
+        for idx in range(1, int(self.prefetch_distance/step) + 1):
+            ahead_lat = lat + idx*dlat
+            ahead_long = long + idx*dlong
+            if not self.inScope(ahead_lat, ahead_long):
+                break
+            key, offset = self.dbsql.locate(*self.getDimensions(ahead_lat, ahead_long))
+            if key not in self.cache and key not in keys:
+                keys.append(key)
+        self.prefetcher.request(keys)
+
+    def reset_cache_statistics(self):
+        """
+        reset the hit, miss, eviction and point read counters
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.point_reads = 0
+
     # elevation data ========
 
     def _getLat(self, rowId: int):
         """
         Get the latitude which corresponds with the id
         """
-        return self.row_headers[rowId]
+        return self.geotransform[3] + (rowId + 0.5)*self.geotransform[5]
 
     def _getLong(self, colId: int):
         """
         Get the longitude which corresponds with the id
         """
-        return self.col_headers[colId]
+        return self.geotransform[0] + (colId + 0.5)*self.geotransform[1]
 
     def _get_distance(self, fromPlace: tuple, toPlace: tuple):
         """
@@ -142,18 +261,23 @@ class Dbcache:
         returns the elevation in meters (-1 is error)
         """
         try:
+            if not (0 <= rowId < self.row_len and 0 <= colId < self.col_len):
+                raise IndexError("cell out of the arena: "+str((rowId, colId)))
             # get binary elevation data 
-            row = self._get_either_row(rowId) # row data (binary)
-            col2 = 2*colId # offset in row
-            bytes = row[col2:col2+2]
-            elevation = int.from_bytes(bytes, "big")
+            key, col2 = self.dbsql.locate(rowId, colId) # row (or chunk) and offset in it
+            cell = self._get_cell(key, col2)
+            if len(cell) != 2: # missing or short row (or chunk)
+                raise LookupError("cell not in the database: "+str((rowId, colId)))
+            elevation = int.from_bytes(cell, "big", signed=True) # decode without copying the row
+            if elevation == VOID:
+                raise LookupError("cell without data: "+str((rowId, colId)))
             return { 
                 "elevtn":elevation, 
                 "rowId": rowId, "colId": colId, 
                 "lat": self._getLat(rowId), "long": self._getLong(colId) 
             }
         except Exception as err:
-            logging.error("Get matrix cell error: "+err.args)
+            logging.error("Get matrix cell error: "+str(err.args))
             return {} # empty
 
     def _get_direction(self, lat, long):
@@ -184,8 +308,7 @@ class Dbcache:
             logging.warning("Query for 'nearest neighbour' is out of scope: ("+str(lat)+", "+str(long)+")")
             return {} # empty
         try:
-            rowId = round((self.bounding_box['top'] - lat)*self.row_fctr) # ordered descending
-            colId = round((long - self.bounding_box['left'])*self.col_fctr) # ordered ascending
+            rowId, colId = self.getDimensions(lat, long) # rows descending, cols ascending
             return self._get_elevation(rowId, colId)
         except Exception as err:
             logging.error("Get nearest neighbour error: "+str(err.args))
@@ -201,6 +324,249 @@ class Dbcache:
         else:
             return nearest["elevtn"]
         
+    def _group_by_block(self, lats, longs):
+        """
+        locate the points (lats, longs: NumPy arrays) in scope and group them by row (or chunk)
+        :return list of (key, points, cells): block key, indices of the points, cell indices in the block
+        """
+        bb = self.bounding_box
+        in_scope = (lats <= bb['top']) & (lats >= bb['bottom']) & (longs >= bb['left']) & (longs <= bb['right'])
+        points = np.flatnonzero(in_scope)
+        if not points.size:
+            return []
+        rowIds = np.floor((lats.flat[points] - self.geotransform[3])*self.row_fctr).astype(np.int64)
+        colIds = np.floor((longs.flat[points] - self.geotransform[0])*self.col_fctr).astype(np.int64)
+        keys, offsets = self.dbsql.locate(rowIds, colIds)
+        keys = np.stack(keys, axis=1) if isinstance(keys, tuple) else keys[:, None]
+        blocks, inverse = np.unique(keys, axis=0, return_inverse=True)
+        order = np.argsort(inverse.reshape(-1), kind="stable")
+        bounds = np.searchsorted(inverse.reshape(-1)[order], np.arange(len(blocks) + 1))
+        groups = []
+        for idx, block in enumerate(blocks):
+            group = order[bounds[idx]:bounds[idx+1]]
+            key = tuple(int(k) for k in block) if len(block) > 1 else int(block[0])
+            groups.append((key, points[group], offsets[group] // 2))
+        return groups
+
+    def get_elevations(self, lats, longs, nodata=-1):
+        """
+        Get the elevations in meters of many points (batch query, vectorized):
+        lats, longs are NumPy arrays (or sequences), each row (or chunk) is read once
+        :return NumPy integer array, nodata for points out of scope
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        longs = np.asarray(longs, dtype=np.float64)
+        elevations = np.full(lats.shape, nodata, dtype=np.int32)
+        for key, points, cells in self._group_by_block(lats, longs):
+            self._set_block_elevations(elevations, self._get_either_row(key), points, cells, nodata)
+        return elevations
+
+    def _set_block_elevations(self, elevations, block, points, cells, nodata=VOID):
+        """
+        set the elevations of the points (indices) from the cells (indices) of one row (or chunk),
+        void cells are set to nodata
+        """
+        values = np.frombuffer(block, dtype=">i2") # decoded like _get_elevation
+        found = cells < len(values)
+        values = values[cells[found]].astype(np.int32) # any nodata
+        elevations.flat[points[found]] = np.where(values == VOID, nodata, values)
+
+    def _get_overview_row(self, level, rowId, stat):
+        """
+        Get an overview row from the cache (or the database)
+        :return NumPy array, big endian int16 (empty if the row does not exist)
+        """
+        key = ("overview", level, stat, rowId)
+        row = self._getRowFromCache(key)
+        if not row:
+            row = self.dbsql.get_overview_row(level, rowId, stat)
+            self._addRowToCache(key, row)
+        return np.frombuffer(row, dtype=">i2")
+
+    def _get_segment_cells(self, fromPlace, toPlace):
+        """
+        Get the cells crossed by the segment from fromPlace to toPlace (lat, long tuples),
+        each cell once in traversal order (DDA: the segment is split at every crossing of
+        a row or column boundary, vectorized), diagonal step through a cell corner
+        :return (rowIds, colIds) NumPy integer arrays
+        """
+        start = np.array([(fromPlace[0] - self.geotransform[3])*self.row_fctr,
+                          (fromPlace[1] - self.geotransform[0])*self.col_fctr])
+        delta = np.array([(toPlace[0] - self.geotransform[3])*self.row_fctr,
+                          (toPlace[1] - self.geotransform[0])*self.col_fctr]) - start
+        crossings = [np.zeros(1), np.ones(1)]
+        for axis in (0, 1):
+            if delta[axis] != 0:
+                low, high = sorted((start[axis], start[axis] + delta[axis]))
+                boundaries = np.arange(math.floor(low) + 1, math.ceil(high))
+                crossings.append((boundaries - start[axis])/delta[axis])
+        ts = np.unique(np.concatenate(crossings)) # sorted
+        keep = np.diff(ts) > 1e-9 # through a corner: no cell for the rounding error
+        middles = ((ts[:-1] + ts[1:])/2)[keep] if len(ts) > 1 else ts
+        cells = np.floor(start[:, None] + delta[:, None]*middles).astype(np.int64)
+        return cells[0], cells[1]
+
+    def get_cell_profile(self, waypoints, nodata=-1):
+        """
+        Get the elevation profile of the route defined in 'waypoints' (list of (lat, long) tuples),
+        exactly one value per cell crossed (no skipped or repeated cells, unlike trackpoints
+        sampled every INTERVALLDISTANCE), each row (or chunk) is read once
+        :return list of (rowId, colIds, elevations) in flying order, one item per run of
+            cells in the same row, NumPy integer arrays, nodata for cells out of the arena
+        """
+        rowIds, colIds = [], []
+        last = None # cell
+        for fromPlace, toPlace in zip(waypoints[:-1], waypoints[1:]):
+            segment_rows, segment_cols = self._get_segment_cells(fromPlace, toPlace)
+            if last == (segment_rows[0], segment_cols[0]):
+                segment_rows, segment_cols = segment_rows[1:], segment_cols[1:] # waypoint cell once
+            if len(segment_rows):
+                rowIds.append(segment_rows)
+                colIds.append(segment_cols)
+                last = (segment_rows[-1], segment_cols[-1])
+        if not rowIds:
+            return []
+        rowIds, colIds = np.concatenate(rowIds), np.concatenate(colIds)
+        in_arena = (rowIds >= 0) & (rowIds < self.row_len) & (colIds >= 0) & (colIds < self.col_len)
+        elevations = np.full(rowIds.shape, nodata, dtype=np.int32)
+        elevations[in_arena] = self.get_elevations(
+            self.geotransform[3] + (rowIds[in_arena] + 0.5)*self.geotransform[5], # cell centers
+            self.geotransform[0] + (colIds[in_arena] + 0.5)*self.geotransform[1], nodata)
+        runs = np.flatnonzero(np.diff(rowIds)) + 1
+        return [(int(rows[0]), cols, values) for rows, cols, values in
+                zip(np.split(rowIds, runs), np.split(colIds, runs), np.split(elevations, runs))]
+
+    def iter_elevations(self, tracks, nodata=-1):
+        """
+        Stream the elevations of a stream of trackpoint chunks (see Route.iter_tracks),
+        one batch query per chunk
+        :return generator of (lats, longs, elevations) NumPy arrays
+        """
+        for lats, longs in tracks:
+            yield lats, longs, self.get_elevations(lats, longs, nodata)
+
+    def iter_flight_information(self, tracks):
+        """
+        Stream the flight information (see get_flight_information) of a stream of
+        trackpoint chunks (see Route.iter_tracks), the rows (or chunks) of each trackpoint
+        chunk are loaded into the cache with one batch query first
+        :return generator of (lat, long, flight information) tuples
+        """
+        for lats, longs in tracks:
+            self.get_elevations(lats, longs) # warm the cache
+            for lat, long in zip(lats.tolist(), longs.tolist()):
+                yield lat, long, self.get_flight_information(lat, long)
+
+    def get_overview_level(self, resolution):
+        """
+        Get the coarsest overview level with cells not larger than resolution (meters),
+        0 is the full resolution grid (no overviews, or resolution finer than level 1)
+        """
+        cell = abs(self.geotransform[5])*METERSPERDEGREE # meters, north-south
+        level = 0
+        for overview_level in self.overview_levels:
+            if cell*2**overview_level <= resolution:
+                level = overview_level
+        return level
+
+    def get_overview_elevations(self, lats, longs, resolution, stat="max", nodata=-1):
+        """
+        Get the elevations in meters of many points at a coarser resolution (meters), from the
+        overview levels: stat 'max' (conservative for obstacle clearance), 'min' or 'mean'
+        of all cells in the overview cell, full resolution (stat ignored) if there is no such level
+        :return NumPy integer array, nodata for points out of scope
+        """
+        level = self.get_overview_level(resolution)
+        if level == 0:
+            return self.get_elevations(lats, longs, nodata)
+        lats = np.asarray(lats, dtype=np.float64)
+        longs = np.asarray(longs, dtype=np.float64)
+        elevations = np.full(lats.shape, nodata, dtype=np.int32)
+        bb = self.bounding_box
+        in_scope = (lats <= bb['top']) & (lats >= bb['bottom']) & (longs >= bb['left']) & (longs <= bb['right'])
+        points = np.flatnonzero(in_scope)
+        rowIds = np.floor((lats.flat[points] - self.geotransform[3])*self.row_fctr).astype(np.int64) >> level
+        colIds = np.floor((longs.flat[points] - self.geotransform[0])*self.col_fctr).astype(np.int64) >> level
+        for rowId in np.unique(rowIds):
+            values = self._get_overview_row(level, int(rowId), stat)
+            group = np.flatnonzero(rowIds == rowId)
+            found = colIds[group] < len(values)
+            values = values[colIds[group[found]]].astype(np.int32)
+            elevations.flat[points[group[found]]] = np.where(values == VOID, nodata, values)
+        return elevations
+
+    def get_overview_elevation(self, lat: float, long: float, resolution, stat="max"):
+        """
+        Get the elevation in meters (integer) at a coarser resolution (meters), -1 is error,
+        see get_overview_elevations
+        """
+        return int(self.get_overview_elevations([lat], [long], resolution, stat)[0])
+
+    def _get_corridor_cells(self, lat, long, compass, distance, width, level):
+        """
+        Get the cells of a grid level (0 is full resolution) touched by the corridor,
+        a rectangle from (lat, long) distance meters along the compass heading and width meters wide
+        :return list of (rowId, first colId, last colId), clipped to the arena
+        """
+        heading = radians(compass)
+        meters_lat = METERSPERDEGREE
+        meters_long = METERSPERDEGREE*cos(radians(lat))
+        ahead = (distance*cos(heading)/meters_lat, distance*sin(heading)/meters_long) # (dlat, dlong)
+        side = (-width/2*sin(heading)/meters_lat, width/2*cos(heading)/meters_long)
+        corners = [(lat + a*ahead[0] + b*side[0], long + a*ahead[1] + b*side[1])
+                   for a, b in ((0, -1), (1, -1), (1, 1), (0, 1))] # convex, in order
+        scale = 2**level
+        points = [((c_lat - self.geotransform[3])*self.row_fctr/scale,
+                   (c_long - self.geotransform[0])*self.col_fctr/scale) for c_lat, c_long in corners]
+        rows, cols = -(-self.row_len // scale), -(-self.col_len // scale) # ceiling
+        edges = list(zip(points, points[1:] + points[:1]))
+        cells = []
+        first = max(math.floor(min(p[0] for p in points)), 0)
+        last = min(math.floor(max(p[0] for p in points)), rows - 1)
+        for rowId in range(first, last + 1):
+            # column extent of the polygon in the strip rowId .. rowId+1: corners in the strip
+            # and crossings of the edges with the strip boundaries
+            xs = [p[1] for p in points if rowId <= p[0] <= rowId + 1]
+            for (y0, x0), (y1, x1) in edges:
+                for y in (rowId, rowId + 1):
+                    if y0 != y1 and min(y0, y1) <= y <= max(y0, y1):
+                        xs.append(x0 + (y - y0)*(x1 - x0)/(y1 - y0))
+            if xs:
+                colFirst = max(math.floor(min(xs)), 0)
+                colLast = min(math.floor(max(xs)), cols - 1)
+                if colFirst <= colLast:
+                    cells.append((rowId, colFirst, colLast))
+        return cells
+
+    def get_corridor_maximum(self, lat: float, long: float, compass, distance, width):
+        """
+        Get the highest terrain in the corridor ahead, from (lat, long) distance meters
+        along the compass heading (0 .. 360 degrees), width meters wide (centered on the track).
+        Uses the coarsest 'max' overview with cells not wider than the corridor, one row slice
+        per overview row (conservative: overview cells reaching out of the corridor count),
+        the full resolution cells without overviews.
+        :return elevation in meters (integer), -1 if the corridor is out of the arena
+        """
+        level = self.get_overview_level(width)
+        cells = self._get_corridor_cells(lat, long, compass, distance, width, level)
+        maximum = -1
+        if level == 0:
+            if not self.full_scan_logged and width >= 2*abs(self.geotransform[5])*METERSPERDEGREE:
+                logging.warning("Corridor maximum: no overview level, every cell is read (see buildXZYSQL --overviews)")
+                self.full_scan_logged = True # once per cache
+            if cells:
+                rowIds = np.concatenate([np.full(last - first + 1, rowId) for rowId, first, last in cells])
+                colIds = np.concatenate([np.arange(first, last + 1) for rowId, first, last in cells])
+                elevations = self.get_elevations(self.geotransform[3] + (rowIds + 0.5)*self.geotransform[5],
+                                                 self.geotransform[0] + (colIds + 0.5)*self.geotransform[1])
+                maximum = int(elevations.max())
+            return maximum
+        for rowId, first, last in cells:
+            values = self._get_overview_row(level, rowId, "max")[first:last + 1]
+            if len(values):
+                maximum = max(maximum, int(values.max()))
+        return maximum
+
     def get_flight_information(self, lat: float, long: float):
         """
         Get flight information:
@@ -221,6 +587,8 @@ class Dbcache:
             direction, compass = self._get_direction(lat, long)
             if not direction: # is empty
                 return currentElevation, currentElevation, None, None
+            if self.prefetcher:
+                self._prefetch(lat, long, compass)
             # get next cell in flying direction
             rowId = nearest["rowId"] + NEXTCELLS[direction][0]
             colId = nearest["colId"] + NEXTCELLS[direction][1]
@@ -228,7 +596,7 @@ class Dbcache:
             nextElevation = nextCell["elevtn"]
             return currentElevation, nextElevation, direction, round(compass, 2)
         except Exception as err:
-            logging.error("Get elevations, unknown error: "+err.args)
+            logging.error("Get elevations, unknown error: "+str(err.args))
             return currentElevation, currentElevation, None, None
 
 
@@ -0,0 +1,89 @@
+"""
+Pool of read-only SQLite connections, one per thread.
+    SQLite connections cannot be shared between threads,
+    Dbpool hands out a read-only Dbsql per thread (created on first use),
+    so the threads of a service can run concurrent elevation lookups on one database file.
+"""
+
+# packages
+from Dbsql import Dbsql
+from Raster import VOID
+from threading import local, Lock
+import math
+
+
+class Dbpool:
+
+    def __init__(self, dbpath):
+        """
+        Initialize the pool, connections are opened on first use in each thread
+        """
+        self.dbpath = dbpath
+        self.local = local() # per thread: connection
+        self.lock = Lock()
+        self.connections = [] # all connections, closed by close()
+        with Dbsql(dbpath, readonly=True) as sqldb:
+            self.geotransform = sqldb.get_geotransform() # shared (read only) arena geometry
+            self.shape = sqldb.get_shape()
+        self.row_fctr = 1/self.geotransform[5] # multiplication factors, same as Dbcache
+        self.col_fctr = 1/self.geotransform[1]
+        pass
+
+    # context manager ========
+
+    def __enter__(self):
+        """
+        context manager: begin session
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        context manager: end of session
+        """
+        self.close()
+
+    # connections ========
+
+    def get(self):
+        """
+        get the read-only connection (Dbsql) of the calling thread
+        """
+        sqldb = getattr(self.local, "sqldb", None)
+        if sqldb is None:
+            sqldb = Dbsql(self.dbpath, readonly=True)
+            self.local.sqldb = sqldb
+            with self.lock:
+                self.connections.append(sqldb)
+        return sqldb
+
+    def close(self):
+        """
+        close all connections, call when the threads using the pool are done
+        """
+        with self.lock:
+            for sqldb in self.connections:
+                sqldb.conn.close()
+            self.connections = []
+        self.local = local()
+
+    # elevation data ========
+
+    def get_elevation(self, lat: float, long: float):
+        """
+        Get the elevation in meters (integer) of the cell nearest to (lat, long),
+        thread-safe point read (see Dbsql.get_cell), -1 is out of scope or no data
+        """
+        rowId = math.floor((lat - self.geotransform[3])*self.row_fctr)
+        colId = math.floor((long - self.geotransform[0])*self.col_fctr)
+        if not (0 <= rowId < self.shape[0] and 0 <= colId < self.shape[1]):
+            return -1
+        cell = self.get().get_cell(rowId, colId)
+        elevation = int.from_bytes(cell, "big", signed=True) if len(cell) == 2 else VOID
+        return -1 if elevation == VOID else elevation
+
+
+# main ========
+
+if __name__ == '__main__':
+    print("This Dbpool class module shall not be invoked on it's own.")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+"""
+    Elevation server (asyncio), one shared warm cache for all simulator processes on a host
+        protocol: line-delimited JSON over TCP or a Unix socket, one response line per request
+            {"id": 1, "op": "info"}
+            {"id": 2, "op": "elevation", "lat": 47.17, "long": 8.51}
+            {"id": 3, "op": "elevations", "lats": [...], "longs": [...]}
+            {"id": 4, "op": "flight", "lat": 47.17, "long": 8.51}
+        response: {"id": 2, "result": ...} or {"id": 2, "error": "..."}
+        requests of one connection are answered in order, "flight" uses the
+        previous position of the same connection (direction)
+    Concurrent requests for the same row (or chunk) are coalesced into a single read,
+    the reads run in a thread pool (read-only connection per thread, see Dbpool),
+    never on the event loop.
+    Usage:
+        Dbserver.py [database] [--port N | --socket PATH] [--workers N]
+"""
+
+# packages ========
+
+from Dbcache import Dbcache, MAXCACHEBYTES
+from Dbpool import Dbpool
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import logging
+import argparse
+import sys
+import numpy as np
+from decouple import config
+
+# constants ========
+
+HOST = "127.0.0.1"
+PORT = 8765
+WORKERS = 4 # threads reading the database
+LIMIT = 16*1024*1024 # maximum length of a request line (batch queries)
+
+
+class Dbserver:
+
+    def __init__(self, dbpath, workers=WORKERS, cache_bytes=MAXCACHEBYTES):
+        """
+        Initialize the server: shared cache (event loop only) and reader threads
+        """
+        self.dbcache = Dbcache(dbpath, cache_bytes=cache_bytes, window_reads=0) # whole blocks only
+        self.pool = Dbpool(dbpath)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.inflight = {} # key: future of the block read
+        self.reads = 0     # statistics
+        self.coalesced = 0
+        self.requests = 0
+        pass
+
+    def close(self):
+        """
+        stop the reader threads, close the connections
+        """
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+        self.dbcache.dbsql.conn.close()
+
+    # blocks ========
+
+    def _read_block(self, key):
+        """
+        read one row (or chunk) in a reader thread
+        """
+        return self.pool.get().get_block(key)
+
+    async def _load(self, key):
+        """
+        load one row (or chunk) into the cache, concurrent loads of the same block share one read
+        :return block (memoryview)
+        """
+        if key in self.dbcache.cache:
+            return self.dbcache._getRowFromCache(key)
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, self._read_block, key)
+            self.inflight[key] = future
+            self.reads += 1
+            try:
+                block = await future
+            finally:
+                del self.inflight[key]
+        else:
+            self.coalesced += 1
+            block = await future
+        if key not in self.dbcache.cache:
+            self.dbcache._addRowToCache(key, block)
+        return block
+
+    async def _load_cells(self, cells):
+        """
+        load the blocks of the cells (rowId, colId) which are in the arena
+        """
+        keys = set()
+        for rowId, colId in cells:
+            if 0 <= rowId < self.dbcache.row_len and 0 <= colId < self.dbcache.col_len:
+                keys.add(self.dbcache.dbsql.locate(rowId, colId)[0])
+        await asyncio.gather(*(self._load(key) for key in keys))
+
+    # queries ========
+
+    async def info(self, request, state):
+        """
+        arena geometry
+        """
+        return {
+            "bounding_box": self.dbcache.bounding_box, "geotransform": self.dbcache.geotransform,
+            "shape": [self.dbcache.row_len, self.dbcache.col_len]
+        }
+
+    async def elevation(self, request, state):
+        """
+        elevation in meters (integer) of one point, -1 is error
+        """
+        lat, long = float(request["lat"]), float(request["long"])
+        if self.dbcache.inScope(lat, long):
+            await self._load_cells([self.dbcache.getDimensions(lat, long)])
+        return self.dbcache.get_elevation(lat, long)
+
+    async def elevations(self, request, state):
+        """
+        elevations in meters (integers) of many points, -1 for points out of scope,
+        from the loaded blocks (a request may span more blocks than the cache keeps)
+        """
+        lats = np.asarray(request["lats"], dtype=np.float64)
+        longs = np.asarray(request["longs"], dtype=np.float64)
+        groups = self.dbcache._group_by_block(lats, longs)
+        blocks = await asyncio.gather(*(self._load(key) for key, points, cells in groups))
+        elevations = np.full(lats.shape, -1, dtype=np.int32)
+        for (key, points, cells), block in zip(groups, blocks):
+            self.dbcache._set_block_elevations(elevations, block, points, cells)
+        return elevations.tolist()
+
+    async def flight(self, request, state):
+        """
+        flight information (see Dbcache.get_flight_information), direction from the previous
+        position of this connection
+        """
+        lat, long = float(request["lat"]), float(request["long"])
+        if self.dbcache.inScope(lat, long):
+            rowId, colId = self.dbcache.getDimensions(lat, long)
+            await self._load_cells([(rowId + i, colId + j) for i in (-1, 0, 1) for j in (-1, 0, 1)])
+        self.dbcache.last_position = state.get("last_position")
+        rslt = self.dbcache.get_flight_information(lat, long)
+        state["last_position"] = self.dbcache.last_position
+        return list(rslt)
+
+    async def statistics(self, request, state):
+        """
+        server and cache statistics
+        """
+        return {
+            "requests": self.requests, "reads": self.reads, "coalesced": self.coalesced,
+            "cache": self.dbcache.get_cache_statistics()
+        }
+
+    # connections ========
+
+    async def _read_line(self, reader):
+        """
+        read one request line
+        :return bytes, empty at the end of the stream, None if the line exceeds LIMIT (skipped)
+        """
+        oversize = False
+        while True:
+            try:
+                line = await reader.readuntil(b"\n")
+                return None if oversize else line
+            except asyncio.IncompleteReadError as err: # end of the stream
+                return b"" if oversize else err.partial
+            except asyncio.LimitOverrunError as err:
+                oversize = True
+                await reader.read(err.consumed) # skip up to the end of the line
+
+    async def handle(self, reader, writer):
+        """
+        serve one client connection
+        """
+        operations = {
+            "info": self.info, "elevation": self.elevation, "elevations": self.elevations,
+            "flight": self.flight, "statistics": self.statistics
+        }
+        state = {} # per connection
+        try:
+            while True:
+                line = await self._read_line(reader)
+                if line is not None and not line:
+                    break # client closed the connection
+                self.requests += 1
+                response = {}
+                try:
+                    if line is None:
+                        raise ValueError("request exceeds " + str(LIMIT) + " bytes")
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request is not a JSON object")
+                    response["id"] = request.get("id")
+                    operation = operations.get(request.get("op"))
+                    if operation is None:
+                        raise ValueError("unknown operation: " + str(request.get("op")))
+                    response["result"] = await operation(request, state)
+                except (ValueError, KeyError, TypeError) as err:
+                    response["error"] = str(err)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as err:
+            logging.warning("Dbserver connection error: " + str(err))
+        finally:
+            writer.close()
+
+    async def serve(self, port=PORT, socket=None):
+        """
+        run the server until cancelled, on TCP (localhost:port) or a Unix socket
+        """
+        if socket:
+            server = await asyncio.start_unix_server(self.handle, path=socket, limit=LIMIT)
+        else:
+            server = await asyncio.start_server(self.handle, HOST, port, limit=LIMIT)
+        async with server:
+            await server.serve_forever()
+
+
+# main code ==============================================
+
+def main(arguments):
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('database', help="Arena database", nargs='?', default=None)
+    parser.add_argument('-p', '--port', help="TCP port (localhost)", default=PORT, type=int)
+    parser.add_argument('-s', '--socket', help="Unix socket path (instead of TCP)", default=None)
+    parser.add_argument('-w', '--workers', help="Number of threads reading the database",
+                        default=WORKERS, type=int)
+    args = parser.parse_args(arguments)
+
+    server = Dbserver(args.database or config("DB_FILENAME"), workers=args.workers)
+    print("Serving elevations on " + (args.socket or HOST + ":" + str(args.port)))
+    try:
+        asyncio.run(server.serve(port=args.port, socket=args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -3,28 +3,87 @@ SQLite with Copernicus elevation data.
 N x 1200 x 1200 cells with geospatial coordinates and elevation data.
     Each coordinate describes the center point of the geospatial cell.
     N is the number of tiles needed for arena.
+Storage layout (per database, see settings table):
+    rows: one blob per arena row (zeroblob of max_bytes), tiles are appended to the rows
+    chunks: one blob per CHUNK_EDGE x CHUNK_EDGE chunk, keyed by (chunk_row, chunk_col),
+        append-only, queries read only the chunks they touch
+Row and column headers are computed from the arena geotransform and shape (settings table).
+Rows and chunks are encoded with the codec of the database (see Codec, settings table),
+    compressed blobs are decoded on read.
 """
 
 import sqlite3
+import pathlib
 from sqlite3.dbapi2 import Connection, Cursor
+from contextlib import contextmanager
 import logging
 import pickle
 import json
+import hashlib
+import numpy as np
+from Raster import Raster, FILL
+from Codec import CODEC_RAW, check_codec, encode, decode
+
+# constants ========
+BULK_CACHE_BYTES = 64*1024*1024 # default page cache for bulk loads
+LAYOUT_ROWS = "rows"
+LAYOUT_CHUNKS = "chunks"
+CHUNK_EDGE = 240 # chunk height and width in cells, divides the tile edge (1200): append-only ingestion
+
 
 class Dbsql:
 
-    def __init__(self, dbpath):
+    def __init__(self, dbpath, bulk=False, fast=False, cache_bytes=BULK_CACHE_BYTES, layout=None, codec=None,
+                 readonly=False):
         """ 
         Initialize the SQL database 
+        bulk: bulk-load mode (builds), WAL journal and a page cache of cache_bytes
+        fast: bulk-load mode without fsync (synchronous=OFF), the database is safe
+              if the build crashes, but not if the system loses power
+        layout: storage layout of a new database (LAYOUT_ROWS or LAYOUT_CHUNKS),
+              existing databases keep their layout
+        codec: codec of the rows or chunks of a new database (see Codec),
+              existing databases keep their codec
+        readonly: read-only connection to an existing database (queries),
+              one connection per thread, see Dbpool
         """
         self.dbpath = dbpath # location and name of database file
+        self.in_transaction = False # see transaction()
+        self.readonly = readonly
         #
         # build database
-        self.conn: Connection = sqlite3.connect(dbpath)
+        if readonly:
+            # readers: no schema script, no writes (query_only),
+            # databases built before the current schema are read with the old schema (see schema),
+            # they are migrated by the next build (writable connection)
+            uri = pathlib.Path(dbpath).absolute().as_uri() + "?mode=ro"
+            self.conn: Connection = sqlite3.connect(uri, uri=True, check_same_thread=False) # closed by Dbpool
+            self.conn.execute("PRAGMA query_only=ON;")
+            self.schema = self._get_schema()
+        else:
+            self.conn: Connection = sqlite3.connect(dbpath)
+            self._create_tables(bulk, fast, cache_bytes)
+            self.schema = self._get_schema()
+        # storage layout and codec ====
+        if codec:
+            check_codec(codec)
+        self.layout = self._init_setting("layout", layout, LAYOUT_ROWS)
+        self.codec = self._init_setting("codec", codec, CODEC_RAW)
+        pass
+
+    def _create_tables(self, bulk, fast, cache_bytes):
+        """
+        set the pragmas and conditionally create (or migrate) the tables
+        """
         cursor: Cursor = self.conn.cursor()
         try:
+            if bulk or fast:
+                cursor.execute("PRAGMA journal_mode=WAL;")
+                cursor.execute("PRAGMA synchronous=" + ("OFF;" if fast else "NORMAL;"))
+                cursor.execute("PRAGMA cache_size=" + str(-int(cache_bytes // 1024)) + ";") # in KiB
             # conditionally create tables ...
             cursor.executescript("""
+                -- pickled headers, databases built before the geotransform (settings table)
                 CREATE TABLE IF NOT EXISTS colhdrs(
                   id INTEGER PRIMARY KEY AUTOINCREMENT,
                   colhdrs BLOB NOT NULL
@@ -38,17 +97,65 @@ class Dbsql:
                   len INTEGER NOT NULL,
                   row BLOB NOT NULL
                 );
+                CREATE TABLE IF NOT EXISTS chunks(
+                  id INTEGER PRIMARY KEY,
+                  chunk_row INTEGER NOT NULL,
+                  chunk_col INTEGER NOT NULL,
+                  chunk BLOB NOT NULL,
+                  UNIQUE(chunk_row, chunk_col)
+                );
+                CREATE TABLE IF NOT EXISTS overviews(
+                  level INTEGER NOT NULL,
+                  id INTEGER NOT NULL,
+                  max BLOB NOT NULL,
+                  min BLOB NOT NULL,
+                  mean BLOB NOT NULL,
+                  PRIMARY KEY(level, id)
+                );
+                CREATE TABLE IF NOT EXISTS rasters(
+                  name TEXT NOT NULL,
+                  id INTEGER NOT NULL,
+                  cells BLOB NOT NULL,
+                  PRIMARY KEY(name, id)
+                );
+                CREATE TABLE IF NOT EXISTS settings(
+                  key TEXT PRIMARY KEY,
+                  value TEXT NOT NULL
+                );
                 CREATE TABLE IF NOT EXISTS metadata(
                   id INTEGER PRIMARY KEY,
                   tilepath TEXT NOT NULL,
-                  tileinfo TEXT NOT NULL
+                  tileinfo TEXT NOT NULL,
+                  tilename TEXT,
+                  status TEXT,
+                  checksum TEXT
                 );
             """)
+            # databases built before incremental builds: add tile status columns
+            columns = [info[1] for info in cursor.execute("PRAGMA table_info(metadata);")]
+            for column in ("tilename", "status", "checksum"):
+                if column not in columns:
+                    cursor.execute("ALTER TABLE metadata ADD COLUMN " + column + " TEXT;")
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS metadata_tilename ON metadata(tilename);")
             self.conn.commit()
         except sqlite3.Error as e:
             logging.error("SQLite CREATE TABLE error occurred:" + e.args[0])
         pass
 
+    def _get_schema(self):
+        """
+        get the tables of the database and their columns
+        :return dictionary {table: list of columns}, empty if the schema cannot be read
+        """
+        try:
+            cursor: Cursor = self.conn.cursor()
+            tables = [name for (name,) in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table';")]
+            return {table: [info[1] for info in cursor.execute("PRAGMA table_info(" + table + ");")]
+                    for table in tables}
+        except sqlite3.Error as e:
+            logging.error("SQLite schema error occurred:" + e.args[0])
+            return {}
+
     # context manager ========
 
     def __enter__(self):
@@ -63,115 +170,191 @@ class Dbsql:
         """
         self.conn.close() # close connection
 
-    # row headers ========
+    # transactions ========
 
-    def set_row_headers(self, row_headers):
+    @contextmanager
+    def transaction(self):
         """
-        set pickled row headers (latitudes aka Y, values descending)
+        run a group of writes (e.g. one tile) in one transaction:
+        commit at the end, rollback if an exception occurs
         """
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.conn.execute("BEGIN;")
+        self.in_transaction = True
         try:
-            sql = "INSERT INTO rowhdrs(rowhdrs) VALUES (?);"
-            cursor: Cursor = self.conn.cursor()
-            b_data = pickle.dumps(row_headers, protocol=-1) # serialize row headers
-            cursor.execute(sql, (b_data,))
+            yield self
+            self.in_transaction = False
+            self.conn.commit()
+        except BaseException:
+            self.in_transaction = False
+            self.conn.rollback()
+            raise
+
+    def _commit(self):
+        """
+        commit, unless a transaction (see transaction) is active
+        """
+        if not self.in_transaction:
             self.conn.commit()
-        except sqlite3.Error as e:
-            logging.error("SQLite INSERT TABLE rowhdrs error occurred:" + e.args[0])
-        pass
 
-    def add_row_headers(self, row_headers):
+    def end_bulk_load(self):
         """
-        add (append) pickled row headers (latitudes aka Y, values descending)
-        tiles are added to the database from top(N) to bottom(S), left(W) to right(E)
+        end of bulk load: durable checkpoint of the WAL journal into the database file,
+        back to the default (rollback) journal and full synchronous mode
         """
         try:
-            # concatenate row headers
-            rowhdrs = self.get_row_headers() + row_headers
-            # remove original record
-            sql = "DELETE FROM rowhdrs;" # delete all(one) record
             cursor: Cursor = self.conn.cursor()
-            cursor.execute(sql)
-            cursor.close()
-            # write back concatenated row headers
-            self.set_row_headers(rowhdrs)
-            pass
+            cursor.execute("PRAGMA synchronous=FULL;")
+            cursor.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            cursor.execute("PRAGMA journal_mode=DELETE;")
         except sqlite3.Error as e:
-            logging.error("SQLite ADD TO TABLE rowhdrs error occurred:" + e.args[0])
+            logging.error("SQLite end_bulk_load error occurred: " + e.args[0])
         pass
 
-    def get_row_headers(self):
+    # settings ========
+
+    def set_setting(self, key: str, value: str):
         """
-        get row headers (latitudes aka Y, values descending)
-        :return deserialized row headers
+        set (insert or replace) one database setting, e.g. the storage layout,
+        errors in a transaction are raised (rollback of the transaction)
         """
         try:
-            sql = "SELECT rowhdrs FROM rowhdrs ORDER BY id DESC LIMIT 1;"
+            sql = "INSERT OR REPLACE INTO settings(key, value) VALUES (?, ?);"
             cursor: Cursor = self.conn.cursor()
-            cursor.execute(sql)
-            rslt = pickle.loads(cursor.fetchone()[0]) # deserialize row headers
+            cursor.execute(sql, (key, value))
+            self._commit()
         except sqlite3.Error as e:
-            logging.error("SQLite SELECT TABLE rowhdrs error occurred:" + e.args[0])
-            rslt = []
-        return rslt
+            logging.error("SQLite INSERT TABLE settings error occurred:" + e.args[0])
+            if self.in_transaction:
+                raise
+        pass
 
-    # column headers ========
+    def _init_setting(self, key: str, value, default):
+        """
+        setting of an existing database, else value (stored) or default (databases without settings)
+        """
+        current = self.get_setting(key)
+        if current is None:
+            if value and not self.readonly:
+                self.set_setting(key, value)
+            return value or default
+        if value and value != current:
+            logging.warning("Dbsql: "+key+" '"+value+"' ignored, database has "+key+" '"+current+"'.")
+        return current
 
-    def set_col_headers(self, col_headers):
+    def get_setting(self, key: str, default=None):
         """
-        set pickled column headers (longitudes aka X, aka values ascending)
+        get one database setting
+        :return value (string), default if not set
         """
+        if "settings" not in self.schema:
+            return default # database built before the settings
         try:
-            sql = "INSERT INTO colhdrs(colhdrs) VALUES (?);"
+            sql = "SELECT value FROM settings WHERE key = ?;"
             cursor: Cursor = self.conn.cursor()
-            b_data= pickle.dumps(col_headers, protocol=-1) # serialize column headers
-            cursor.execute(sql, (b_data,))
-            self.conn.commit()
+            cursor.execute(sql, (key,))
+            rslt = cursor.fetchone()
+            return rslt[0] if rslt else default
         except sqlite3.Error as e:
-            logging.error("SQLite INSERT TABLE colhdrs error occurred:" + e.args[0])
+            logging.error("SQLite SELECT TABLE settings error occurred:" + e.args[0])
+            return default
+
+    # geotransform ========
+
+    def put_geotransform(self, geotransform, pixel_top, pixel_left, rows, cols):
+        """
+        set the arena geotransform from the geotransform of one tile at (pixel_top, pixel_left),
+        and grow the arena shape to include the tile (rows x cols),
+        GDAL style: (origin_x, pixel_width, 0, origin_y, 0, pixel_height), origin is the NW corner
+        """
+        gt = list(geotransform)
+        gt[0] -= pixel_left*gt[1] # arena origin
+        gt[3] -= pixel_top*gt[5]
+        shape = self.get_shape() or (0, 0)
+        self.set_setting("geotransform", json.dumps(gt))
+        self.set_setting("shape", json.dumps([max(shape[0], pixel_top + rows), max(shape[1], pixel_left + cols)]))
         pass
-    
-    def add_col_headers(self, col_headers):
+
+    def get_geotransform(self):
+        """
+        get the arena geotransform (GDAL style), databases without geotransform:
+        derived from the pickled row and column headers (cell centers)
+        :return tuple, None if the database is empty
+        """
+        gt = self.get_setting("geotransform")
+        if gt is not None:
+            return tuple(json.loads(gt))
+        row_headers = self._get_pickled_headers("rowhdrs")
+        col_headers = self._get_pickled_headers("colhdrs")
+        if not row_headers or not col_headers:
+            return None
+        dy = _get_spacing(row_headers)
+        dx = _get_spacing(col_headers)
+        return (col_headers[0] - dx/2, dx, 0.0, row_headers[0] - dy/2, 0.0, dy)
+
+    def get_shape(self):
+        """
+        get the arena shape (rows, cols), databases without geotransform: from the pickled headers
+        :return tuple, None if the database is empty
         """
-        add (append) pickled column headers (longitudes aka X, values ascending)
-        tiles are added to the database from top(N) to bottom(S), left(W) to right(E)
+        shape = self.get_setting("shape")
+        if shape is not None:
+            return tuple(json.loads(shape))
+        row_headers = self._get_pickled_headers("rowhdrs")
+        col_headers = self._get_pickled_headers("colhdrs")
+        if not row_headers or not col_headers:
+            return None
+        return len(row_headers), _get_count(col_headers)
+
+    # headers ========
+
+    def _get_pickled_headers(self, table):
+        """
+        get the pickled headers of databases built before the geotransform (table rowhdrs or colhdrs)
+        :return deserialized headers, empty if none
         """
         try:
-            # concatenate column headers
-            colhdrs = self.get_col_headers() + col_headers
-            # remove original record
-            sql = "DELETE FROM colhdrs;" # delete all(one) record
+            sql = "SELECT " + table + " FROM " + table + " ORDER BY id DESC LIMIT 1;"
             cursor: Cursor = self.conn.cursor()
             cursor.execute(sql)
-            cursor.close()
-            # write back concatenated column headers
-            self.set_col_headers(colhdrs)
-            pass
+            rslt = cursor.fetchone()
+            return pickle.loads(rslt[0]) if rslt else [] # deserialize headers
         except sqlite3.Error as e:
-            logging.error("SQLite ADD TO TABLE colhdrs error occurred:" + e.args[0])
-        pass
+            logging.error("SQLite SELECT TABLE " + table + " error occurred:" + e.args[0])
+            return []
+
+    def get_row_headers(self):
+        """
+        get row headers (latitudes aka Y of the cell centers, values descending)
+        :return list
+        """
+        gt = self.get_geotransform()
+        if gt is None:
+            return []
+        return [gt[3] + (row + 0.5)*gt[5] for row in range(self.get_shape()[0])]
 
     def get_col_headers(self):
         """
-        get column headers (longitudes aka X, aka values ascending)
-        :return deserialized column headers
+        get column headers (longitudes aka X of the cell centers, values ascending)
+        :return list
         """
-        try:
-            sql = "SELECT colhdrs FROM colhdrs ORDER BY id DESC LIMIT 1;"
-            cursor: Cursor = self.conn.cursor()
-            cursor.execute(sql)
-            rslt = pickle.loads(cursor.fetchone()[0]) # deserialize column headers
-        except sqlite3.Error as e:
-            logging.error("SQLite SELECT TABLE colhdrs error occurred:" + e.args[0])
-            rslt = []
-        return rslt
+        gt = self.get_geotransform()
+        if gt is None:
+            return []
+        return [gt[0] + (col + 0.5)*gt[1] for col in range(self.get_shape()[1])]
 
     # matrix ========
 
-    def set_rows(self, matrix: list, pixel_top, pixel_left, max_bytes):
+    def set_rows(self, matrix, pixel_top, pixel_left, max_bytes):
         """
-        set(copy) all rows from the matrix to the database
+        set(copy) all rows from the matrix (Raster or list of rows) to the database
         :return number of rows set, 0 is error
         """
+        if self.layout == LAYOUT_CHUNKS:
+            return self.set_chunks(matrix, pixel_top, pixel_left)
+        if self.codec != CODEC_RAW:
+            return self.put_encoded_rows(matrix, pixel_top, pixel_left)
         try:
             if pixel_left != 0:
                 raise AssertionError("Illegal call to set_rows, use add_rows instead.")
@@ -179,13 +362,13 @@ class Dbsql:
             sql = "INSERT INTO rows(id, len, row) VALUES (?, ?, zeroblob(?));"
             bytes_len = len(matrix[0]) # size of one row, for Copernicus: 2400
             # add each matrix row to empty table
+            cursor.executemany(sql, ((idx+pixel_top, bytes_len, max_bytes) for idx in range(len(matrix)))) # zeroblobs
             idx = 0
             for idx in range(len(matrix)):
                 db_index = idx+pixel_top
-                cursor.execute(sql, (db_index, bytes_len, max_bytes)) # write zeroblob
                 with self.conn.blobopen("rows", "row", db_index) as blob:
                     blob.write(matrix[idx]) # write one blob from matrix to zeroblob in database
-                self.conn.commit()
+                self._commit()
             return idx
         except AssertionError as ae:
             logging.error(ae.args[0])
@@ -194,11 +377,15 @@ class Dbsql:
             logging.error("SQLite set_rows error occurred: " + e.args[0])
             return 0
 
-    def add_rows(self, matrix: list, pixel_top, pixel_left, max_bytes):
+    def add_rows(self, matrix, pixel_top, pixel_left, max_bytes):
         """
-        add(append) all rows from the matrix to the database
+        add(append) all rows from the matrix (Raster or list of rows) to the database
         :return number of rows added, 0 is error
         """
+        if self.layout == LAYOUT_CHUNKS:
+            return self.set_chunks(matrix, pixel_top, pixel_left)
+        if self.codec != CODEC_RAW:
+            return self.put_encoded_rows(matrix, pixel_top, pixel_left)
         try:
             if pixel_left == 0:
                 raise AssertionError('Illegal call to add_rows, use set_rows instead.')
@@ -215,10 +402,10 @@ class Dbsql:
                 with self.conn.blobopen("rows", "row", db_index) as blob:
                     blob.seek(offset) # insert from here (offset)
                     blob.write(matrix[idx]) # write one blob from matrix to zeroblob in database
-                self.conn.commit()
-                # update new length in database
-                cursor.execute(sql, (new_len, db_index))
-                self.conn.commit()
+                self._commit()
+            # update new length in database
+            cursor.executemany(sql, ((new_len, idx+pixel_top) for idx in range(len(matrix))))
+            self._commit()
             return idx
         except AssertionError as ae:
             logging.error(ae.args[0])
@@ -227,23 +414,373 @@ class Dbsql:
             logging.error("SQLite add_rows error occurred:" + e.args[0])
             return 0
 
+    def put_rows(self, matrix, pixel_top, pixel_left, max_bytes):
+        """
+        put (replace or append) all rows from the matrix at any tile position,
+        used by incremental builds: missing rows are created, blobs smaller
+        than max_bytes (arena grown to the east) are enlarged
+        :return number of rows put, 0 is error
+        """
+        if self.layout == LAYOUT_CHUNKS:
+            return self.set_chunks(matrix, pixel_top, pixel_left)
+        if self.codec != CODEC_RAW:
+            return self.put_encoded_rows(matrix, pixel_top, pixel_left)
+        try:
+            cursor: Cursor = self.conn.cursor()
+            sql_new = "INSERT OR IGNORE INTO rows(id, len, row) VALUES (?, 0, zeroblob(?));"
+            sql_len = "UPDATE rows SET len = max(len, ?) WHERE id = ?;"
+            offset = pixel_left*2 # two bytes per pixel
+            idx = 0
+            for idx in range(len(matrix)):
+                db_index = idx+pixel_top
+                new_len = offset + len(matrix[idx])
+                if new_len > max_bytes:
+                    raise AssertionError('Blob length exceeds the maximum allowed.')
+                cursor.execute(sql_new, (db_index, max_bytes)) # write zeroblob, if new
+                cursor.execute("SELECT length(row) FROM rows WHERE id = ?;", (db_index,))
+                if cursor.fetchone()[0] < max_bytes:
+                    # enlarge blob, keep contents
+                    old_row = self.get_row(db_index)
+                    cursor.execute("UPDATE rows SET row = zeroblob(?) WHERE id = ?;", (max_bytes, db_index))
+                    with self.conn.blobopen("rows", "row", db_index) as blob:
+                        blob.write(old_row)
+                with self.conn.blobopen("rows", "row", db_index) as blob:
+                    blob.seek(offset) # insert from here (offset)
+                    blob.write(matrix[idx]) # write one blob from matrix to zeroblob in database
+                cursor.execute(sql_len, (new_len, db_index)) # update length in database
+                self._commit()
+            return idx
+        except AssertionError as ae:
+            logging.error(ae.args[0])
+            return 0
+        except sqlite3.Error as e:
+            logging.error("SQLite put_rows error occurred: " + e.args[0])
+            return 0
+
+    def stream_rows(self, rows, pixel_top, pixel_left, max_bytes):
+        """
+        write rows to the database as they arrive (streaming ingestion),
+        rows: iterator of (latitude, row), like XYZ.iter_rows
+        set (pixel_left is 0) or add (pixel_left > 0) each row, see set_rows and add_rows
+        :return list of latitudes (row headers) of the rows written, empty is error
+        """
+        latitudes = []
+        if self.layout == LAYOUT_CHUNKS or self.codec != CODEC_RAW:
+            # write one band of CHUNK_EDGE rows at a time
+            put = self.set_chunks if self.layout == LAYOUT_CHUNKS else self.put_encoded_rows
+            band = []
+            for latitude, row in rows:
+                band.append(row)
+                latitudes.append(latitude)
+                if len(band) == CHUNK_EDGE:
+                    if not put(band, pixel_top+len(latitudes)-CHUNK_EDGE, pixel_left):
+                        return []
+                    band = []
+            if band and not put(band, pixel_top+len(latitudes)-len(band), pixel_left):
+                return []
+            return latitudes
+        try:
+            cursor: Cursor = self.conn.cursor()
+            sql_set = "INSERT INTO rows(id, len, row) VALUES (?, ?, zeroblob(?));"
+            sql_add = "UPDATE rows SET len = ? WHERE id = ?;"
+            offset = pixel_left*2 # two bytes per pixel
+            for idx, (latitude, row) in enumerate(rows):
+                db_index = idx+pixel_top
+                new_len = offset + len(row)
+                if offset == 0:
+                    cursor.execute(sql_set, (db_index, new_len, max_bytes)) # write zeroblob
+                elif new_len > max_bytes:
+                    raise AssertionError('Blob length exceeds the maximum allowed.')
+                with self.conn.blobopen("rows", "row", db_index) as blob:
+                    blob.seek(offset) # insert from here (offset)
+                    blob.write(row) # write one row to zeroblob in database
+                if offset > 0:
+                    cursor.execute(sql_add, (new_len, db_index)) # update new length in database
+                self._commit()
+                latitudes.append(latitude)
+            return latitudes
+        except AssertionError as ae:
+            logging.error(ae.args[0])
+            return []
+        except sqlite3.Error as e:
+            logging.error("SQLite stream_rows error occurred: " + e.args[0])
+            return []
+
+    def set_chunks(self, matrix, pixel_top, pixel_left):
+        """
+        set (insert or replace) the chunks of the matrix (Raster or list of rows),
+        pixel_top and pixel_left are multiples of CHUNK_EDGE (chunks layout)
+        :return number of rows set, 0 is error
+        """
+        try:
+            if pixel_top % CHUNK_EDGE or pixel_left % CHUNK_EDGE:
+                raise AssertionError("Illegal call to set_chunks, position is not aligned with the chunks.")
+            if isinstance(matrix, Raster):
+                array = matrix.to_array()
+            else:
+                array = np.frombuffer(b"".join(matrix), dtype=">i2").reshape(len(matrix), -1)
+            rows, cols = array.shape
+            chunk_top = pixel_top // CHUNK_EDGE
+            chunk_left = pixel_left // CHUNK_EDGE
+            sql = "INSERT OR REPLACE INTO chunks(chunk_row, chunk_col, chunk) VALUES (?, ?, ?);"
+            cursor: Cursor = self.conn.cursor()
+            cursor.executemany(sql, (
+                (chunk_top + i // CHUNK_EDGE, chunk_left + j // CHUNK_EDGE,
+                 encode(self.codec, array[i:i+CHUNK_EDGE, j:j+CHUNK_EDGE]))
+                for i in range(0, rows, CHUNK_EDGE) for j in range(0, cols, CHUNK_EDGE)))
+            self._commit()
+            return rows
+        except AssertionError as ae:
+            logging.error(ae.args[0])
+            return 0
+        except sqlite3.Error as e:
+            logging.error("SQLite set_chunks error occurred: " + e.args[0])
+            return 0
+
+    def put_encoded_rows(self, matrix, pixel_top, pixel_left):
+        """
+        put (replace or append) the rows of the matrix (Raster or list of rows) at any tile position,
+        rows layout with a codec: each row is stored as one encoded blob without padding,
+        the existing row is decoded, merged with the new cells and encoded again
+        :return number of rows put, 0 is error
+        """
+        try:
+            cursor: Cursor = self.conn.cursor()
+            sql_get = "SELECT row FROM rows WHERE id = ?;"
+            sql_put = "INSERT OR REPLACE INTO rows(id, len, row) VALUES (?, ?, ?);"
+            offset = pixel_left*2 # two bytes per pixel
+            for idx in range(len(matrix)):
+                db_index = idx+pixel_top
+                cursor.execute(sql_get, (db_index,))
+                local_row = cursor.fetchone()
+                old_row = decode(self.codec, local_row[0]) if local_row else b""
+                row = bytearray(max(len(old_row), offset + len(matrix[idx])))
+                row[:len(old_row)] = old_row
+                row[offset:offset + len(matrix[idx])] = matrix[idx]
+                cursor.execute(sql_put, (db_index, len(row), encode(self.codec, bytes(row))))
+            self._commit()
+            return len(matrix)
+        except sqlite3.Error as e:
+            logging.error("SQLite put_encoded_rows error occurred: " + e.args[0])
+            return 0
+
+    def get_chunk(self, chunk_row, chunk_col):
+        """
+        get one chunk (chunks layout), CHUNK_EDGE rows of CHUNK_EDGE cells
+        :return BLOB(memoryview), empty if the chunk does not exist
+        """
+        try:
+            sql = "SELECT chunk FROM chunks WHERE chunk_row = ? AND chunk_col = ?;"
+            cursor: Cursor = self.conn.cursor()
+            cursor.execute(sql, (chunk_row, chunk_col))
+            local_chunk = cursor.fetchone()
+            rslt = memoryview(decode(self.codec, local_chunk[0])) if local_chunk else memoryview(b"")
+        except sqlite3.Error as e:
+            logging.error("SQLite SELECT TABLE chunks error occurred:" + e.args[0])
+            rslt = memoryview(b"") # empty
+        return rslt
+
+    def locate(self, row_id, col_id):
+        """
+        locate one cell in the storage layout, row_id and col_id may be NumPy arrays (elementwise)
+        :return (key, offset): key of the block (row or chunk) for get_block, byte offset in the block
+        """
+        if self.layout == LAYOUT_CHUNKS:
+            chunk_row, row = divmod(row_id, CHUNK_EDGE)
+            chunk_col, col = divmod(col_id, CHUNK_EDGE)
+            return (chunk_row, chunk_col), 2*(row*CHUNK_EDGE + col)
+        return row_id, 2*col_id
+
+    def get_block(self, key):
+        """
+        get one block of the storage layout, key from locate: row (rows) or chunk (chunks)
+        :return BLOB(memoryview)
+        """
+        if self.layout == LAYOUT_CHUNKS:
+            return self.get_chunk(*key)
+        return self.get_row(key)
+
+    def get_window(self, key, offset, nbytes):
+        """
+        read nbytes at byte offset of one block (key from locate), e.g. a single cell or a short span,
+        raw blobs are read with incremental blob I/O (only the bytes needed),
+        compressed blobs are decoded and sliced
+        :return bytes, empty if the block does not exist
+        """
+        if self.codec != CODEC_RAW:
+            return bytes(self.get_block(key)[offset:offset + nbytes])
+        try:
+            if self.layout == LAYOUT_CHUNKS:
+                cursor: Cursor = self.conn.cursor()
+                cursor.execute("SELECT id FROM chunks WHERE chunk_row = ? AND chunk_col = ?;", key)
+                local_chunk = cursor.fetchone()
+                if not local_chunk:
+                    return b""
+                table, column, rowid = "chunks", "chunk", local_chunk[0]
+            else:
+                table, column, rowid = "rows", "row", key
+            with self.conn.blobopen(table, column, rowid, readonly=True) as blob:
+                blob.seek(offset)
+                return blob.read(nbytes)
+        except sqlite3.Error as e:
+            logging.error("SQLite blob read error occurred: " + e.args[0])
+            return b""
+
+    def get_cell(self, row_id, col_id):
+        """
+        read one cell (point read), see get_window
+        :return bytes (big endian), empty if the cell does not exist
+        """
+        key, offset = self.locate(row_id, col_id)
+        return self.get_window(key, offset, 2)
+
     def get_row(self, row_id):
         """
         get one row from the matrix in the database
-        :return BLOB(bytearray)
+        :return BLOB(memoryview, without copying the row)
         """
+        if self.layout == LAYOUT_CHUNKS:
+            # assemble the row from its chunks, each at its column (missing chunks: no data)
+            try:
+                shape = self.get_shape()
+                row = bytearray(FILL) * (shape[1] if shape else 0)
+                sql = "SELECT chunk_col, chunk FROM chunks WHERE chunk_row = ? ORDER BY chunk_col ASC;"
+                cursor: Cursor = self.conn.cursor()
+                cursor.execute(sql, (row_id // CHUNK_EDGE,))
+                offset = 2*CHUNK_EDGE*(row_id % CHUNK_EDGE)
+                for chunk_col, chunk in cursor:
+                    if self.codec != CODEC_RAW:
+                        chunk = decode(self.codec, chunk)
+                    start = 2*CHUNK_EDGE*chunk_col
+                    end = min(start + 2*CHUNK_EDGE, len(row))
+                    if start < end:
+                        row[start:end] = chunk[offset:offset + end - start]
+                return memoryview(row)
+            except sqlite3.Error as e:
+                logging.error("SQLite SELECT TABLE chunks error occurred:" + e.args[0])
+                return memoryview(bytearray()) # empty
         try:
             sql = "SELECT id, len, row FROM rows WHERE ID = ?;"
             cursor: Cursor = self.conn.cursor()
             cursor.execute(sql, (row_id,))
             local_row = cursor.fetchone()
             bytes_len = local_row[1]
-            rslt = local_row[2][:bytes_len]
+            if self.codec != CODEC_RAW:
+                rslt = memoryview(decode(self.codec, local_row[2])) # no padding
+            else:
+                rslt = memoryview(local_row[2])[:bytes_len]
         except sqlite3.Error as e:
             logging.error("SQLite SELECT TABLE row error occurred:" + e.args[0])
             rslt = bytearray() # empty bytearray
         return rslt
 
+    # overviews ========
+
+    def set_overview_rows(self, level, pixel_top, maxs, mins, means):
+        """
+        set (insert or replace) rows of one overview level (factor 2**level),
+        maxs, mins, means: arrays with the same shape (rows x cols), stored as big endian int16
+        :return number of rows set, 0 is error
+        """
+        try:
+            sql = "INSERT OR REPLACE INTO overviews(level, id, max, min, mean) VALUES (?, ?, ?, ?, ?);"
+            cursor: Cursor = self.conn.cursor()
+            cursor.executemany(sql, (
+                (level, pixel_top + idx, maxs[idx].astype(">i2").tobytes(),
+                 mins[idx].astype(">i2").tobytes(), means[idx].astype(">i2").tobytes())
+                for idx in range(len(maxs))))
+            self._commit()
+            return len(maxs)
+        except sqlite3.Error as e:
+            logging.error("SQLite set_overview_rows error occurred: " + e.args[0])
+            return 0
+
+    def get_overview_row(self, level, row_id, stat="max"):
+        """
+        get one row of an overview level, stat: 'max', 'min' or 'mean'
+        :return BLOB(memoryview) with big endian int16, empty if the row does not exist
+        """
+        if stat not in ("max", "min", "mean"):
+            raise ValueError("Dbsql: unknown overview statistic '" + str(stat) + "'")
+        if "overviews" not in self.schema:
+            return memoryview(b"") # database built before the overviews
+        try:
+            sql = "SELECT " + stat + " FROM overviews WHERE level = ? AND id = ?;"
+            cursor: Cursor = self.conn.cursor()
+            cursor.execute(sql, (level, row_id))
+            local_row = cursor.fetchone()
+            return memoryview(local_row[0]) if local_row else memoryview(b"")
+        except sqlite3.Error as e:
+            logging.error("SQLite SELECT TABLE overviews error occurred:" + e.args[0])
+            return memoryview(b"")
+
+    def get_overview_levels(self):
+        """
+        get the overview levels in the database
+        :return list of levels, ascending (level 1 is half the resolution)
+        """
+        if "overviews" not in self.schema:
+            return [] # database built before the overviews
+        try:
+            cursor: Cursor = self.conn.cursor()
+            cursor.execute("SELECT DISTINCT level FROM overviews ORDER BY level ASC;")
+            return [level for (level,) in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error("SQLite SELECT TABLE overviews error occurred:" + e.args[0])
+            return []
+
+    # result rasters ========
+
+    def set_raster_rows(self, name, pixel_top, matrix, info=None):
+        """
+        set (insert or replace) rows of a result raster (e.g. a viewshed) with the arena shape,
+        matrix: array (rows x cols) of int16 values, encoded with the codec of the database,
+        info: description of the raster (JSON serializable), stored in the settings
+        :return number of rows set, 0 is error
+        """
+        try:
+            sql = "INSERT OR REPLACE INTO rasters(name, id, cells) VALUES (?, ?, ?);"
+            cursor: Cursor = self.conn.cursor()
+            cursor.executemany(sql, ((name, pixel_top + idx, encode(self.codec, np.asarray(row)))
+                                     for idx, row in enumerate(matrix)))
+            self._commit()
+            if info is not None:
+                self.set_setting("raster:" + name, json.dumps(info))
+            return len(matrix)
+        except sqlite3.Error as e:
+            logging.error("SQLite set_raster_rows error occurred: " + e.args[0])
+            return 0
+
+    def get_raster_row(self, name, row_id):
+        """
+        get one row of a result raster
+        :return bytes (big endian int16, decoded), empty if the row does not exist (no values)
+        """
+        if "rasters" not in self.schema:
+            return b"" # database built before the result rasters
+        try:
+            sql = "SELECT cells FROM rasters WHERE name = ? AND id = ?;"
+            cursor: Cursor = self.conn.cursor()
+            cursor.execute(sql, (name, row_id))
+            local_row = cursor.fetchone()
+            return decode(self.codec, local_row[0]) if local_row else b""
+        except sqlite3.Error as e:
+            logging.error("SQLite SELECT TABLE rasters error occurred:" + e.args[0])
+            return b""
+
+    def delete_raster(self, name):
+        """
+        delete all rows of a result raster
+        """
+        try:
+            cursor: Cursor = self.conn.cursor()
+            cursor.execute("DELETE FROM rasters WHERE name = ?;", (name,))
+            cursor.execute("DELETE FROM settings WHERE key = ?;", ("raster:" + name,))
+            self._commit()
+        except sqlite3.Error as e:
+            logging.error("SQLite DELETE TABLE rasters error occurred:" + e.args[0])
+        pass
+
     # metadata ========
 
     def set_metadata_item(self, tilepath: str, tileinfo: str):
@@ -254,17 +791,61 @@ class Dbsql:
             sql = "INSERT INTO metadata(tilepath, tileinfo) VALUES (?, ?);"
             cursor: Cursor = self.conn.cursor()
             cursor.execute(sql, (tilepath, tileinfo))
-            self.conn.commit()
+            self._commit()
         except sqlite3.Error as e:
             logging.error("SQLite INSERT TABLE metadata error occurred:" + e.args[0])
         pass
 
+    def set_tile_status(self, tilename: str, tilepath: str, tileinfo: str, status: str, checksum: str):
+        """
+        set (insert or update) metadata and build status for one tile,
+        status: 'started' or 'complete', checksum: of the tile source file,
+        and renew the build stamp: sha256 of the previous stamp and the tile (deterministic,
+        the same tiles written in the same order give the same stamp, see Mmcache.is_current),
+        errors in a transaction are raised (rollback of the tile)
+        """
+        try:
+            sql = """INSERT INTO metadata(tilepath, tileinfo, tilename, status, checksum) VALUES (?, ?, ?, ?, ?)
+                     ON CONFLICT(tilename) DO UPDATE SET
+                       tilepath = excluded.tilepath, tileinfo = excluded.tileinfo,
+                       status = excluded.status, checksum = excluded.checksum;"""
+            cursor: Cursor = self.conn.cursor()
+            cursor.execute(sql, (tilepath, tileinfo, tilename, status, checksum))
+            self._commit()
+            stamp = hashlib.sha256((self.get_setting("stamp") or "").encode("ascii"))
+            stamp.update(json.dumps([tilename, status, checksum]).encode("utf-8"))
+            self.set_setting("stamp", stamp.hexdigest())
+        except sqlite3.Error as e:
+            logging.error("SQLite UPSERT TABLE metadata error occurred:" + e.args[0])
+            if self.in_transaction:
+                raise
+        pass
+
+    def get_tile_status(self, tilename: str):
+        """
+        get build status for one tile
+        :return (status, checksum), (None, None) if the tile is unknown
+        """
+        try:
+            if "status" not in self.schema.get("metadata", []):
+                return None, None # built before incremental builds
+            sql = "SELECT status, checksum FROM metadata WHERE tilename = ?;"
+            cursor: Cursor = self.conn.cursor()
+            cursor.execute(sql, (tilename,))
+            rslt = cursor.fetchone()
+            return rslt if rslt else (None, None)
+        except sqlite3.Error as e:
+            logging.error("SQLite SELECT TABLE metadata error occurred:" + e.args[0])
+            return None, None
+
     def get_metadata_items(self):
         """
-        get all metadata records
+        get all metadata records (of complete tiles)
         """
         try:
-            sql = "SELECT tilepath, tileinfo FROM metadata ORDER BY id ASC;"
+            sql = "SELECT tilepath, tileinfo FROM metadata WHERE status IS NULL OR status = 'complete' ORDER BY id ASC;" \
+                if "status" in self.schema.get("metadata", []) else \
+                "SELECT tilepath, tileinfo FROM metadata ORDER BY id ASC;" # built before incremental builds
             cursor: Cursor = self.conn.cursor()
             cursor.execute(sql)
             return cursor.fetchall() # list, ('path', 'info')
@@ -274,19 +855,27 @@ class Dbsql:
 
     def get_arena_bounding_box(self):
         """
-        calculate the total bounding box from all tile metadata items
+        calculate the total bounding box (cell centers) from the geotransform,
+        databases without geotransform: from all tile metadata items
         """
-        abb_len = len(self.get_metadata_items())
+        gt = self.get_setting("geotransform")
+        if gt is not None:
+            gt = json.loads(gt)
+            rows, cols = self.get_shape()
+            return {"top": gt[3] + gt[5]/2, "bottom": gt[3] + (rows - 0.5)*gt[5],
+                    "left": gt[0] + gt[1]/2, "right": gt[0] + (cols - 0.5)*gt[1]}
+        items = self.get_metadata_items()
+        abb_len = len(items)
         if abb_len>0:
             # initial values
-            meta = json.loads(self.get_metadata_items()[0][1])
+            meta = json.loads(items[0][1])
             top = meta["top"]
             bottom = meta["bottom"]
             left = meta["left"]
             right = meta["right"]
             # find maximum values
             for idx in range(1, abb_len):
-                meta = json.loads(self.get_metadata_items()[idx][1])
+                meta = json.loads(items[idx][1])
                 if meta["top"] > top: top = meta["top"]
                 if meta["bottom"] < bottom: bottom = meta["bottom"]
                 if meta["left"] < left: left = meta["left"]
@@ -295,6 +884,26 @@ class Dbsql:
             return {"top": top, "bottom": bottom, "left": left, "right": right}
         raise AssertionError('Empty metadata-list in the arena bounding box.')
 
+# functions ========
+
+def _get_count(headers):
+    """
+    number of headers in the first run of monotonic values,
+    the pickled column headers of old databases repeat for each row of tiles
+    """
+    step = headers[1] - headers[0] if len(headers) > 1 else 0
+    for idx in range(1, len(headers)):
+        if (headers[idx] - headers[idx-1])*step <= 0:
+            return idx
+    return len(headers)
+
+def _get_spacing(headers):
+    """
+    cell size from the pickled headers (cell centers)
+    """
+    count = _get_count(headers)
+    return (headers[count-1] - headers[0])/(count - 1) if count > 1 else 0.0
+
 # main ========
 
 if __name__ == '__main__':
@@ -0,0 +1,281 @@
+"""
+GeoTIFF reader for Copernicus DEM tiles (COG), without GDAL.
+    Decodes the first image (full resolution) of a tiled or stripped TIFF
+    into a NumPy array, plus the GDAL style geotransform:
+        (origin_x, pixel_width, 0, origin_y, 0, pixel_height)
+    Supported: classic TIFF and BigTIFF, one sample per pixel,
+    compression none, LZW and deflate, predictor none, horizontal and floating point.
+"""
+
+# packages ========
+
+import struct
+import zlib
+import numpy as np
+
+# constants ========
+
+TIFF_TYPES = {  # tiff type: (struct format, size in bytes)
+    1: ("B", 1), 2: ("c", 1), 3: ("H", 2), 4: ("I", 4), 5: ("II", 8),
+    6: ("b", 1), 7: ("B", 1), 8: ("h", 2), 9: ("i", 4), 10: ("ii", 8),
+    11: ("f", 4), 12: ("d", 8), 16: ("Q", 8), 17: ("q", 8), 18: ("Q", 8)
+}
+SAMPLE_FORMATS = {  # (sample format, bits per sample): numpy type
+    (1, 8): "u1", (1, 16): "u2", (1, 32): "u4",
+    (2, 8): "i1", (2, 16): "i2", (2, 32): "i4",
+    (3, 32): "f4", (3, 64): "f8"
+}
+# tags
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+BITS_PER_SAMPLE = 258
+COMPRESSION = 259
+STRIP_OFFSETS = 273
+SAMPLES_PER_PIXEL = 277
+ROWS_PER_STRIP = 278
+STRIP_BYTE_COUNTS = 279
+PREDICTOR = 317
+TILE_WIDTH = 322
+TILE_LENGTH = 323
+TILE_OFFSETS = 324
+TILE_BYTE_COUNTS = 325
+SAMPLE_FORMAT = 339
+MODEL_PIXEL_SCALE = 33550
+MODEL_TIEPOINT = 33922
+MODEL_TRANSFORMATION = 34264
+GEO_KEY_DIRECTORY = 34735
+GDAL_NODATA = 42113
+# compression schemes
+COMPRESSION_NONE = 1
+COMPRESSION_LZW = 5
+COMPRESSION_DEFLATE = (8, 32946)
+# geokeys
+GT_RASTER_TYPE = 1025
+RASTER_PIXEL_IS_POINT = 2
+
+
+class Geotiff:
+
+    def __init__(self, filename):
+        """
+        Read the TIFF header and the first image file directory (IFD)
+        """
+        self.filename = filename
+        with open(filename, "rb") as file:
+            self.data = file.read()
+        order = self.data[:2]
+        if order == b"II":
+            self.bo = "<" # little endian
+        elif order == b"MM":
+            self.bo = ">" # big endian
+        else:
+            raise ValueError("Geotiff: not a TIFF file: " + filename)
+        magic = struct.unpack_from(self.bo + "H", self.data, 2)[0]
+        if magic == 42:
+            self.bigtiff = False
+            ifd = struct.unpack_from(self.bo + "I", self.data, 4)[0]
+        elif magic == 43:
+            self.bigtiff = True
+            ifd = struct.unpack_from(self.bo + "Q", self.data, 8)[0]
+        else:
+            raise ValueError("Geotiff: unknown TIFF version " + str(magic) + ": " + filename)
+        self.tags = self._read_ifd(ifd)
+        # image structure
+        self.width = self._tag(IMAGE_WIDTH)
+        self.height = self._tag(IMAGE_LENGTH)
+        self.compression = self._tag(COMPRESSION, COMPRESSION_NONE)
+        self.predictor = self._tag(PREDICTOR, 1)
+        if self._tag(SAMPLES_PER_PIXEL, 1) != 1:
+            raise ValueError("Geotiff: only one sample per pixel is supported.")
+        key = (self._tag(SAMPLE_FORMAT, 1), self._tag(BITS_PER_SAMPLE, 1))
+        if key not in SAMPLE_FORMATS:
+            raise ValueError("Geotiff: unsupported sample format " + str(key))
+        self.dtype = np.dtype(self.bo + SAMPLE_FORMATS[key])
+        if TILE_WIDTH in self.tags:
+            self.block_width = self._tag(TILE_WIDTH)
+            self.block_height = self._tag(TILE_LENGTH)
+            self.offsets = self.tags[TILE_OFFSETS]
+            self.byte_counts = self.tags[TILE_BYTE_COUNTS]
+        else:
+            self.block_width = self.width
+            self.block_height = min(self._tag(ROWS_PER_STRIP, self.height), self.height)
+            self.offsets = self.tags[STRIP_OFFSETS]
+            self.byte_counts = self.tags[STRIP_BYTE_COUNTS]
+        self.blocks_across = -(-self.width // self.block_width)   # ceiling
+        self.blocks_down = -(-self.height // self.block_height)   # ceiling
+        # georeference
+        self.geotransform = self._get_geotransform()
+        nodata = self.tags.get(GDAL_NODATA)
+        self.nodata = float(nodata) if nodata else None
+        pass
+
+    # ifd ========
+
+    def _read_ifd(self, offset):
+        """
+        read all entries of one image file directory
+        :return dictionary {tag: value}, single values are unpacked
+        """
+        if self.bigtiff:
+            count = struct.unpack_from(self.bo + "Q", self.data, offset)[0]
+            entry, head, inline = offset + 8, "HHQ", 8
+        else:
+            count = struct.unpack_from(self.bo + "H", self.data, offset)[0]
+            entry, head, inline = offset + 2, "HHI", 4
+        head_len = struct.calcsize(self.bo + head)
+        tags = {}
+        for idx in range(count):
+            tag, typ, n = struct.unpack_from(self.bo + head, self.data, entry)
+            if typ not in TIFF_TYPES:
+                entry += head_len + inline
+                continue # unknown type, skip entry
+            fmt, size = TIFF_TYPES[typ]
+            if size * n <= inline:
+                pos = entry + head_len # value is inline
+            else:
+                pos = struct.unpack_from(self.bo + ("Q" if self.bigtiff else "I"), self.data, entry + head_len)[0]
+            if typ == 2: # ascii
+                value = self.data[pos:pos + n].rstrip(b"\0").decode("ascii")
+            else:
+                value = struct.unpack_from(self.bo + fmt * n, self.data, pos)
+                if typ in (5, 10): # rationals
+                    value = tuple(value[i] / value[i + 1] for i in range(0, len(value), 2))
+                if len(value) == 1:
+                    value = value[0]
+            tags[tag] = value
+            entry += head_len + inline
+        return tags
+
+    def _tag(self, tag, default=None):
+        """
+        get single value of a tag (first item if the tag has several values)
+        """
+        value = self.tags.get(tag, default)
+        if isinstance(value, tuple):
+            value = value[0]
+        return value
+
+    def _get_geotransform(self):
+        """
+        GDAL style geotransform, the origin is the outer corner of the top left pixel
+        """
+        if MODEL_TRANSFORMATION in self.tags:
+            m = self.tags[MODEL_TRANSFORMATION]
+            gt = [m[3], m[0], m[1], m[7], m[4], m[5]]
+        elif MODEL_TIEPOINT in self.tags and MODEL_PIXEL_SCALE in self.tags:
+            i, j, k, x, y, z = self.tags[MODEL_TIEPOINT][:6]
+            sx, sy = self.tags[MODEL_PIXEL_SCALE][:2]
+            gt = [x - i * sx, sx, 0.0, y + j * sy, 0.0, -sy]
+        else:
+            return None # no georeference
+        # raster type 'PixelIsPoint' (e.g. Copernicus), shift by half a pixel like GDAL does
+        keys = self.tags.get(GEO_KEY_DIRECTORY, ())
+        for idx in range(4, len(keys) - 3, 4):
+            if keys[idx] == GT_RASTER_TYPE and keys[idx + 3] == RASTER_PIXEL_IS_POINT:
+                gt[0] -= 0.5 * gt[1]
+                gt[3] -= 0.5 * gt[5]
+        return tuple(gt)
+
+    # decode ========
+
+    def _decode_block(self, index, rows):
+        """
+        decompress one tile or strip and undo the predictor
+        :return numpy array (rows x block_width)
+        """
+        offset = self.offsets[index] if isinstance(self.offsets, tuple) else self.offsets
+        count = self.byte_counts[index] if isinstance(self.byte_counts, tuple) else self.byte_counts
+        raw = self.data[offset:offset + count]
+        if self.compression == COMPRESSION_NONE:
+            pass
+        elif self.compression in COMPRESSION_DEFLATE:
+            raw = zlib.decompress(raw)
+        elif self.compression == COMPRESSION_LZW:
+            raw = lzw_decode(raw)
+        else:
+            raise ValueError("Geotiff: unsupported compression " + str(self.compression))
+        size = self.dtype.itemsize
+        row_bytes = self.block_width * size
+        buf = np.frombuffer(raw, dtype=np.uint8, count=rows * row_bytes).reshape(rows, row_bytes)
+        if self.predictor == 3:
+            # floating point predictor: byte differences, then byte planes (most significant first)
+            buf = np.cumsum(buf, axis=1, dtype=np.uint8)
+            buf = buf.reshape(rows, size, self.block_width).transpose(0, 2, 1)
+            return np.ascontiguousarray(buf).view(self.dtype.newbyteorder(">")).reshape(rows, self.block_width)
+        block = buf.view(self.dtype).reshape(rows, self.block_width)
+        if self.predictor == 2:
+            # horizontal differencing (integer samples)
+            block = np.cumsum(block, axis=1, dtype=self.dtype)
+        return block
+
+    def iter_bands(self):
+        """
+        decode the image band by band (one row of tiles or one strip at a time)
+        :yield (first row, numpy array with the rows of the band)
+        """
+        for down in range(self.blocks_down):
+            top = down * self.block_height
+            rows = min(self.block_height, self.height - top)
+            band = np.empty((rows, self.width), dtype=self.dtype.newbyteorder("="))
+            for across in range(self.blocks_across):
+                left = across * self.block_width
+                cols = min(self.block_width, self.width - left)
+                block = self._decode_block(down * self.blocks_across + across, rows) # last strip may be short
+                band[:, left:left + cols] = block[:, :cols]
+            yield top, band
+
+    def read(self):
+        """
+        decode the full resolution image
+        :return numpy array (height x width)
+        """
+        image = np.empty((self.height, self.width), dtype=self.dtype.newbyteorder("="))
+        for top, band in self.iter_bands():
+            image[top:top + band.shape[0]] = band
+        return image
+
+
+def lzw_decode(data):
+    """
+    decode TIFF flavoured LZW (MSB first, 'early change' code width)
+    :return bytes
+    """
+    table = [bytes((i,)) for i in range(256)] + [b"", b""] # 256: clear, 257: end of information
+    out = bytearray()
+    previous = None
+    nbits = 9
+    bitpos = 0
+    total = len(data) * 8
+    padded = bytes(data) + b"\0\0\0"
+    while bitpos + nbits <= total:
+        byte = bitpos >> 3
+        word = (padded[byte] << 16) | (padded[byte + 1] << 8) | padded[byte + 2]
+        code = (word >> (24 - (bitpos & 7) - nbits)) & ((1 << nbits) - 1)
+        bitpos += nbits
+        if code == 257:
+            break
+        if code == 256:
+            del table[258:]
+            nbits = 9
+            previous = None
+            continue
+        if previous is None:
+            entry = table[code]
+        else:
+            if code < len(table):
+                entry = table[code]
+                table.append(previous + entry[:1])
+            else:
+                entry = previous + previous[:1]
+                table.append(entry)
+            if len(table) >= (1 << nbits) - 1 and nbits < 12:
+                nbits += 1
+        out += entry
+        previous = entry
+    return bytes(out)
+
+
+# main ========
+
+if __name__ == '__main__':
+    print("This Geotiff class module shall not be invoked on it's own.")
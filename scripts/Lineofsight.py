@@ -0,0 +1,103 @@
+"""
+Line of sight between observers and targets over the DSM (batch, vectorized).
+    Each sight line is sampled every half cell (except in the cells of its ends), the samples of all rays of a batch
+    are queried at once (Dbcache.get_elevations or Mmcache: each row or chunk is read once),
+    the terrain is lowered by the earth curvature (with refraction) relative to the sight line.
+    Heights are above ground (default) or above sea level, in meters.
+"""
+
+# packages
+from Dbcache import METERSPERDEGREE
+from Route import EARTHRADIUS, get_central_angle
+import numpy as np
+
+# constants
+REFRACTION = 0.13 # coefficient of refraction, standard atmosphere (radio links: 0.25)
+MAXSAMPLES = 1 << 20 # samples per batch query (memory bound)
+NOELEVATION = -32769 # nodata of the queries (void or out of the arena), not an int16 elevation
+
+
+class Lineofsight:
+
+    def __init__(self, dbcache, curvature=True, refraction=REFRACTION, max_samples=MAXSAMPLES):
+        """
+        Initialize the line of sight engine on a Dbcache (or Mmcache)
+        curvature: correct the terrain for the earth curvature (with refraction)
+        refraction: coefficient of refraction, 0 is no refraction
+        """
+        self.dbcache = dbcache
+        self.step = abs(dbcache.geotransform[5])*METERSPERDEGREE/2 # meters, half cell
+        self.radius = EARTHRADIUS/(1 - refraction) if curvature else None # effective, meters
+        self.max_samples = max_samples
+        pass
+
+    def get_visibility(self, observers, targets, absolute=False):
+        """
+        Check the lines of sight from observers to targets (pairwise)
+        observers, targets: arrays (or sequences) of (lat, long, height) rows
+        absolute: heights above sea level, default above ground
+        :return dictionary of NumPy arrays, one item per ray:
+            visible: True if the terrain does not reach the sight line,
+            rowId, colId: first obstructing cell (from the observer), -1 if visible,
+            clearance: minimum height of the sight line above the (corrected) terrain in meters
+        """
+        observers = np.array(observers, dtype=np.float64).reshape(-1, 3) # copies, heights are changed
+        targets = np.array(targets, dtype=np.float64).reshape(-1, 3)
+        rays = len(observers)
+        result = {
+            "visible": np.zeros(rays, dtype=bool), "rowId": np.full(rays, -1, dtype=np.int64),
+            "colId": np.full(rays, -1, dtype=np.int64), "clearance": np.full(rays, np.nan)
+        }
+        if not absolute:
+            ground = self.dbcache.get_elevations(np.concatenate((observers[:, 0], targets[:, 0])),
+                                                 np.concatenate((observers[:, 1], targets[:, 1])), NOELEVATION)
+            ground[ground == NOELEVATION] = 0 # nodata: sea level
+            observers[:, 2] += ground[:rays]
+            targets[:, 2] += ground[rays:]
+        lengths = EARTHRADIUS*get_central_angle(observers[:, 0], observers[:, 1], targets[:, 0], targets[:, 1])
+        samples = np.maximum(np.ceil(lengths/self.step).astype(np.int64), 1) + 1 # per ray, both ends
+        # batches of rays with at most max_samples samples (at least one ray)
+        first = 0
+        ends = np.cumsum(samples)
+        while first < rays:
+            base = ends[first - 1] if first else 0
+            last = max(int(np.searchsorted(ends, base + self.max_samples, side="right")), first + 1)
+            self._check_rays(observers[first:last], targets[first:last], lengths[first:last],
+                             samples[first:last], {key: value[first:last] for key, value in result.items()})
+            first = last
+        return result
+
+    def _check_rays(self, observers, targets, lengths, samples, result):
+        """
+        Check a batch of rays, all samples with one batch query, result arrays (views) are filled in
+        """
+        offsets = np.cumsum(samples) - samples
+        rays = np.repeat(np.arange(len(samples)), samples)
+        fractions = (np.arange(len(rays)) - offsets[rays])/(samples[rays] - 1)
+        begin, end = observers[rays], targets[rays]
+        lats = begin[:, 0] + fractions*(end[:, 0] - begin[:, 0])
+        longs = begin[:, 1] + fractions*(end[:, 1] - begin[:, 1])
+        rowIds = np.floor((lats - self.dbcache.geotransform[3])*self.dbcache.row_fctr).astype(np.int64)
+        colIds = np.floor((longs - self.dbcache.geotransform[0])*self.dbcache.col_fctr).astype(np.int64)
+        terrain = self.dbcache.get_elevations(lats, longs, NOELEVATION).astype(np.float64)
+        terrain[terrain == NOELEVATION] = -np.inf # void or out of the arena, never obstructs
+        if self.radius:
+            distances = fractions*lengths[rays]
+            terrain += distances*(lengths[rays] - distances)/(2*self.radius) # earth bulge
+        for ends in (offsets, offsets + samples - 1): # cells of the observer and the target
+            terrain[(rowIds == rowIds[ends][rays]) & (colIds == colIds[ends][rays])] = -np.inf
+        clearances = begin[:, 2] + fractions*(end[:, 2] - begin[:, 2]) - terrain
+        result["clearance"][:] = np.minimum.reduceat(clearances, offsets)
+        result["visible"][:] = result["clearance"] >= 0
+        blocked = np.where(clearances < 0, np.arange(len(rays)), len(rays))
+        firsts = np.minimum.reduceat(blocked, offsets)
+        hidden = np.flatnonzero(firsts < len(rays))
+        result["rowId"][hidden] = rowIds[firsts[hidden]]
+        result["colId"][hidden] = colIds[firsts[hidden]]
+        pass
+
+
+# main ========
+
+if __name__ == '__main__':
+    print("This Lineofsight class module shall not be invoked on it's own.")
@@ -0,0 +1,187 @@
+"""
+Memory-mapped flat raster of the arena, for read-heavy serving without SQLite.
+    File layout (export_raster):
+        header: magic, JSON (geotransform, shape, dtype, nodata, stamp), padded to HEADER_BYTES
+        cells: rows x cols elevations, same bytes as the database rows (big endian)
+    Mmcache has the same query API as Dbcache, the file is mapped read-only,
+    so all processes on one host share the page cache copy of the raster.
+"""
+
+# packages
+from Dbsql import Dbsql
+from Dbcache import Dbcache
+from Raster import VOID
+import os
+import json
+import mmap
+import logging
+import numpy as np
+
+# constants
+MAGIC = b"ARENARASTER\n"
+HEADER_BYTES = 4096 # page aligned cells
+DTYPE = ">i2" # big endian, signed like Dbcache decodes the rows
+NODATA = VOID # void cells and cells missing in the database
+
+
+class Mmcache(Dbcache):
+
+    def __init__(self, rasterpath):
+        """
+        Initialize the raster cache, map the raster file (read only)
+        """
+        with open(rasterpath, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mmap[:len(MAGIC)] != MAGIC:
+            self.mmap.close()
+            raise ValueError("Mmcache: not an arena raster file: " + rasterpath)
+        header = json.loads(self.mmap[len(MAGIC):HEADER_BYTES].rstrip(b"\0"))
+        rows, cols = header["shape"]
+        self.nodata = header["nodata"]
+        self.stamp = header.get("stamp")                                            # build stamp of the database
+        self.raster = np.frombuffer(self.mmap, dtype=header["dtype"], offset=HEADER_BYTES,
+                                    count=rows*cols).reshape(rows, cols) # no copy
+        gt = tuple(header["geotransform"])
+        bounding_box = {                                                            # cell centers
+            "top": gt[3] + gt[5]/2, "bottom": gt[3] + (rows - 0.5)*gt[5],
+            "left": gt[0] + gt[1]/2, "right": gt[0] + (cols - 0.5)*gt[1]
+        }
+        self.dbsql = None                                                           # no database, blocks are raster rows
+        self._init_arena(gt, (rows, cols), bounding_box, [])                       # full resolution only
+        self._init_cache(0, 0, 0, None)                                             # the raster needs no cache or prefetching
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        context manager: end of session
+        """
+        del self.raster # release the buffer before closing the map
+        self.mmap.close()
+
+    # blocks ========
+
+    def _group_by_block(self, lats, longs):
+        """
+        locate the points (lats, longs: NumPy arrays) in scope and group them by raster row
+        :return list of (key, points, cells): row id, indices of the points, column ids
+        """
+        bb = self.bounding_box
+        in_scope = (lats <= bb['top']) & (lats >= bb['bottom']) & (longs >= bb['left']) & (longs <= bb['right'])
+        points = np.flatnonzero(in_scope)
+        rowIds = np.floor((lats.flat[points] - self.geotransform[3])*self.row_fctr).astype(np.int64)
+        colIds = np.floor((longs.flat[points] - self.geotransform[0])*self.col_fctr).astype(np.int64)
+        return [(int(rowId), points[rowIds == rowId], colIds[rowIds == rowId]) for rowId in np.unique(rowIds)]
+
+    def _get_either_row(self, key):
+        """
+        get raster row[key] (bytes of the mapping, no copy)
+        """
+        return self.mmap[HEADER_BYTES + 2*self.col_len*key:HEADER_BYTES + 2*self.col_len*(key + 1)]
+
+    def _get_cell(self, key, offset):
+        """
+        get the 2 bytes of one cell at offset of raster row[key]
+        """
+        start = HEADER_BYTES + 2*self.col_len*key + offset
+        return self.mmap[start:start + 2]
+
+    def _get_overview_row(self, level, rowId, stat):
+        """
+        the raster has no overviews
+        """
+        return np.empty(0, dtype=">i2")
+
+    # elevation data ========
+
+    def _get_elevation(self, rowId, colId):
+        """
+        Get the cell value (z, elevation) from the raster
+        with rowId (y, lat) and colId (X, long)
+        returns the elevation in meters (-1 is error)
+        """
+        try:
+            if not (0 <= rowId < self.row_len and 0 <= colId < self.col_len):
+                raise IndexError("cell out of the raster: "+str((rowId, colId)))
+            if self.raster[rowId, colId] == self.nodata:
+                raise LookupError("cell without data: "+str((rowId, colId)))
+            return {
+                "elevtn": int(self.raster[rowId, colId]),
+                "rowId": rowId, "colId": colId,
+                "lat": self._getLat(rowId), "long": self._getLong(colId)
+            }
+        except Exception as err:
+            logging.error("Get raster cell error: "+str(err.args))
+            return {} # empty
+
+    def get_elevations(self, lats, longs, nodata=-1):
+        """
+        Get the elevations in meters of many points (batch query, vectorized)
+        :return NumPy integer array, nodata for points out of scope
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        longs = np.asarray(longs, dtype=np.float64)
+        elevations = np.full(lats.shape, nodata, dtype=np.int32)
+        rowIds = np.floor((lats - self.geotransform[3])*self.row_fctr).astype(np.int64)
+        colIds = np.floor((longs - self.geotransform[0])*self.col_fctr).astype(np.int64)
+        bb = self.bounding_box
+        in_scope = (lats <= bb['top']) & (lats >= bb['bottom']) & (longs >= bb['left']) & (longs <= bb['right'])
+        in_scope &= (rowIds >= 0) & (rowIds < self.row_len) & (colIds >= 0) & (colIds < self.col_len)
+        values = self.raster[rowIds[in_scope], colIds[in_scope]].astype(np.int32) # any nodata
+        elevations[in_scope] = np.where(values == self.nodata, nodata, values) # nodata of the file header
+        return elevations
+
+
+# functions ========
+
+def export_raster(dbpath, rasterpath):
+    """
+    export the arena of the database (any layout or codec) to a flat raster file,
+    written to a temporary file first, then renamed (readers never see a partial raster)
+    :return shape (rows, cols)
+    """
+    with Dbsql(dbpath, readonly=True) as sqldb:
+        geotransform = sqldb.get_geotransform()
+        shape = sqldb.get_shape()
+        if geotransform is None:
+            raise ValueError("export_raster: empty database: " + dbpath)
+        rows, cols = shape
+        header = MAGIC + json.dumps({
+            "geotransform": geotransform, "shape": [rows, cols], "dtype": DTYPE, "nodata": NODATA,
+            "stamp": sqldb.get_setting("stamp")
+        }).encode("ascii")
+        if len(header) > HEADER_BYTES:
+            raise ValueError("export_raster: header exceeds " + str(HEADER_BYTES) + " bytes")
+        nodata_row = NODATA.to_bytes(2, "big", signed=True) * cols
+        temppath = rasterpath + ".tmp"
+        with open(temppath, "wb") as file:
+            file.write(header.ljust(HEADER_BYTES, b"\0"))
+            for row_id in range(rows):
+                row = sqldb.get_row(row_id)[:2*cols]
+                file.write(row)
+                file.write(nodata_row[len(row):]) # missing cells (if any)
+    os.replace(temppath, rasterpath)
+    return rows, cols
+
+def is_current(dbpath, rasterpath):
+    """
+    check if the raster file was exported from the current build of the database:
+    same build stamp (see Dbsql.set_tile_status), geotransform and shape,
+    writes which do not change the arena (e.g. overviews, rasters) keep the raster current
+    :return False if the raster file is missing or outdated
+    """
+    if not os.path.exists(rasterpath):
+        return False
+    try:
+        with Mmcache(rasterpath) as raster, Dbsql(dbpath, readonly=True) as sqldb:
+            return (raster.stamp == sqldb.get_setting("stamp") and
+                    raster.geotransform == sqldb.get_geotransform() and
+                    (raster.row_len, raster.col_len) == sqldb.get_shape())
+    except ValueError as err:
+        logging.error(err.args[0])
+        return False
+
+
+# main ========
+
+if __name__ == '__main__':
+    print("This Mmcache class module shall not be invoked on it's own.")
@@ -0,0 +1,116 @@
+"""
+Background prefetcher for Dbcache: reads rows (or chunks) before they are queried.
+    Dbcache requests the blocks ahead of the drone (heading and speed),
+    a worker thread with its own SQLite connection reads them,
+    Dbcache takes the ready blocks on a cache miss (prefetch hit).
+"""
+
+# packages
+from Dbsql import Dbsql
+from collections import OrderedDict
+from queue import Queue
+from threading import Thread, Lock
+import logging
+
+# constants
+MAXREADYBLOCKS = 64 # blocks read ahead and not yet taken by Dbcache
+
+
+class Prefetcher:
+
+    def __init__(self, dbpath, max_ready=MAXREADYBLOCKS):
+        """
+        Initialize the prefetcher and start the worker thread
+        """
+        self.dbpath = dbpath
+        self.max_ready = max_ready
+        self.queue = Queue()
+        self.lock = Lock()
+        self.ready = OrderedDict() # key: block (memoryview), oldest first
+        self.pending = set()       # keys requested and not yet read
+        self.requested = 0         # statistics
+        self.prefetched = 0
+        self.hits = 0
+        self.wasted = 0
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+        pass
+
+    # worker ========
+
+    def _run(self):
+        """
+        worker thread: read the requested blocks with its own connection
+        """
+        with Dbsql(self.dbpath, readonly=True) as sqldb:
+            while True:
+                key = self.queue.get()
+                if key is None:
+                    return # stop
+                try:
+                    block = sqldb.get_block(key)
+                except Exception as err:
+                    logging.error("Prefetch error: "+str(err.args))
+                    block = None
+                with self.lock:
+                    self.pending.discard(key)
+                    if block:
+                        self.ready[key] = block
+                        self.prefetched += 1
+                        while len(self.ready) > self.max_ready:
+                            self.ready.popitem(last=False) # never taken
+                            self.wasted += 1
+
+    def stop(self):
+        """
+        stop the worker thread, pending requests are dropped
+        """
+        with self.lock:
+            self.pending.clear()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put(None)
+        self.thread.join()
+
+    # requests ========
+
+    def request(self, keys):
+        """
+        request blocks (nearest first), keys which are ready or pending are skipped
+        """
+        with self.lock:
+            for key in keys:
+                if key not in self.ready and key not in self.pending:
+                    self.pending.add(key)
+                    self.requested += 1
+                    self.queue.put(key)
+        pass
+
+    def take(self, key):
+        """
+        take a ready block
+        :return block (memoryview), None if the block is not ready
+        """
+        with self.lock:
+            block = self.ready.pop(key, None)
+            if block is not None:
+                self.hits += 1
+            return block
+
+    def get_statistics(self):
+        """
+        get the prefetch statistics, to tune the look-ahead (hit rate: prefetched blocks used)
+        :return dictionary
+        """
+        with self.lock:
+            return {
+                "requested": self.requested, "prefetched": self.prefetched,
+                "hits": self.hits, "wasted": self.wasted,
+                "hit_rate": self.hits/self.prefetched if self.prefetched else 0.0
+            }
+
+
+# main ========
+
+if __name__ == '__main__':
+    print("This Prefetcher class module shall not be invoked on it's own.")
@@ -0,0 +1,103 @@
+"""
+Raster with elevation data in one contiguous buffer.
+    rows x cols cells, 2 bytes per cell (big endian signed int16, same as the database rows),
+    backed by a bytearray or a NumPy int16 array,
+    rows are exposed as memoryview slices (zero copy).
+"""
+
+# packages ========
+
+import numpy as np
+
+# constants ========
+
+CELL_BYTES = 2 # elevation data up to 32'768 meters
+VOID = -32768 # cells without data, below any elevation (int16 minimum)
+FILL = VOID.to_bytes(CELL_BYTES, byteorder='big', signed=True) # one void cell
+
+
+class Raster:
+
+    def __init__(self, rows, cols, buffer=None):
+        """
+        Initialize the raster, with a new buffer (all cells VOID) or an existing one
+        """
+        self.rows = rows
+        self.cols = cols
+        self.row_bytes = CELL_BYTES * cols
+        if buffer is None:
+            buffer = bytearray(FILL) * (rows * cols)
+        self.buffer = buffer
+        self.view = memoryview(buffer).cast("B")
+        if len(self.view) != rows * self.row_bytes:
+            raise ValueError("Raster: buffer size does not match "+str((rows, cols)))
+        pass
+
+    @classmethod
+    def from_array(cls, array):
+        """
+        build raster from a 2 dimensional array with elevations in meters (integer)
+        """
+        rows, cols = array.shape
+        return cls(rows, cols, np.ascontiguousarray(array, dtype=">i2"))
+
+    def __reduce__(self):
+        """
+        pickle support (parallel builds), memoryviews cannot be pickled and
+        NumPy does not keep the byte order of unpickled arrays, so pickle the bytes
+        """
+        return Raster, (self.rows, self.cols, bytearray(self.view))
+
+    # rows ========
+
+    def __len__(self):
+        """
+        number of rows
+        """
+        return self.rows
+
+    def __getitem__(self, idx):
+        """
+        row[idx] as memoryview (bytes), no copy
+        """
+        if idx < 0:
+            idx += self.rows
+        if not 0 <= idx < self.rows:
+            raise IndexError("Raster: row index out of range.")
+        start = idx * self.row_bytes
+        return self.view[start:start + self.row_bytes]
+
+    def __iter__(self):
+        """
+        iterate over all rows (memoryviews)
+        """
+        for idx in range(self.rows):
+            yield self[idx]
+
+    # cells ========
+
+    def set_cell(self, row, col, z):
+        """
+        set elevation z (integer meters) of one cell
+        """
+        offset = row * self.row_bytes + CELL_BYTES * col
+        self.view[offset:offset + CELL_BYTES] = z.to_bytes(CELL_BYTES, byteorder='big', signed=True)
+
+    def get_cell(self, row, col):
+        """
+        get elevation (integer meters) of one cell, signed like to_array, VOID is no data
+        """
+        offset = row * self.row_bytes + CELL_BYTES * col
+        return int.from_bytes(self.view[offset:offset + CELL_BYTES], "big", signed=True)
+
+    def to_array(self):
+        """
+        elevations as 2 dimensional NumPy array (big endian int16), no copy
+        """
+        return np.frombuffer(self.view, dtype=">i2").reshape(self.rows, self.cols)
+
+
+# main ========
+
+if __name__ == '__main__':
+    print("This Raster class module shall not be invoked on it's own.")
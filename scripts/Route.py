@@ -4,13 +4,15 @@
     depending on the speed of a hypothetical drone. 
 """
 
-from math import radians, sin, cos, acos
 import logging
+import numpy as np
 
 SPEED = 160 # km/hr (police drone)
 INTERVAL = 2 # sampling interval in seconds
 MPSEC = SPEED * 1000 / 60 / 60 # meters/sec
 INTERVALLDISTANCE = MPSEC * INTERVAL
+EARTHRADIUS = 6371010 # meters
+CHUNKPOINTS = 4096 # trackpoints per chunk of the streaming pipeline (iter_tracks)
 
 class Route:
 
@@ -39,12 +41,7 @@ class Route:
         """
         Calculate the distance (in meters) between two points on the globe (haversine formula)
         """
-        mlat = radians(fromPlace[0])
-        mlon = radians(fromPlace[1])
-        plat = radians(toPlace[0])
-        plon = radians(toPlace[1])
-        dist = 6371.01 * acos(sin(mlat)*sin(plat) + cos(mlat)*cos(plat)*cos(mlon - plon))
-        return int(dist*1000) # distance in meters
+        return int(EARTHRADIUS*get_central_angle(fromPlace[0], fromPlace[1], toPlace[0], toPlace[1]))
 
 
     def build_tracks(self, fromWP: tuple, toWP: tuple):
@@ -77,30 +74,118 @@ class Route:
             return []
 
 
+    def build_track_arrays(self, waypoints: list):
+        """
+        Build all trackpoints of the route defined in 'waypoints' (list of (lat, long) tuples)
+        as NumPy arrays in one shot: great-circle legs, each sampled like build_tracks
+        (int(distance / INTERVALLDISTANCE) points, at least both waypoints), each trackpoint
+        computed from the waypoints (no accumulated error), shared waypoints once.
+        The arrays are the input of a batch query, e.g. Dbcache.get_elevations(lats, longs).
+        :return (lats, longs) NumPy float64 arrays, empty if a waypoint is out of scope
+        """
+        empty = (np.empty(0), np.empty(0))
+        for waypoint in waypoints:
+            if not self.inScope(waypoint):
+                logging.critical('Waypoint is out of scope: '+str(waypoint))
+                return empty
+        if len(waypoints) < 2:
+            return empty
+        wps = np.radians(np.asarray(waypoints, dtype=np.float64))
+        lat1, long1, lat2, long2 = wps[:-1, 0], wps[:-1, 1], wps[1:, 0], wps[1:, 1]
+        angles = get_central_angle(lat1, long1, lat2, long2, degrees=False)
+        intervals = np.maximum((EARTHRADIUS*angles/INTERVALLDISTANCE).astype(np.int64), 2) - 1 # per leg
+        # fraction of each trackpoint on its leg, the last waypoint is appended
+        legs = np.repeat(np.arange(len(intervals)), intervals)
+        starts = np.cumsum(intervals) - intervals
+        fractions = (np.arange(len(legs)) - starts[legs])/intervals[legs]
+        # spherical linear interpolation of the unit vectors
+        delta = angles[legs]
+        sin_delta = np.sin(delta)
+        small = sin_delta < 1e-12 # same waypoints: linear
+        safe = np.where(small, 1.0, sin_delta)
+        a = np.where(small, 1 - fractions, np.sin((1 - fractions)*delta)/safe)
+        b = np.where(small, fractions, np.sin(fractions*delta)/safe)
+        vec1 = get_unit_vectors(lat1, long1)[:, legs]
+        vec2 = get_unit_vectors(lat2, long2)[:, legs]
+        x, y, z = a*vec1 + b*vec2
+        lats = np.degrees(np.arctan2(z, np.hypot(x, y)))
+        longs = np.degrees(np.arctan2(y, x))
+        lats[starts], longs[starts] = np.asarray(waypoints[:-1], dtype=np.float64).T # exact waypoints
+        return np.append(lats, waypoints[-1][0]), np.append(longs, waypoints[-1][1])
+
+    def iter_tracks(self, waypoints, chunk_points=CHUNKPOINTS):
+        """
+        Stream the trackpoints of the route defined in 'waypoints' (iterable of (lat, long) tuples),
+        leg by leg (see build_track_arrays), in chunks of chunk_points trackpoints,
+        memory is bounded by the longest leg, not by the route.
+        Legs with a waypoint out of scope are skipped (logged).
+        :return generator of (lats, longs) NumPy float64 arrays
+        """
+        lats, longs = [], [] # pending legs, less than chunk_points trackpoints
+        pending = 0
+        prvsWP = None
+        for waypoint in waypoints:
+            if prvsWP: # not empty
+                leg_lats, leg_longs = self.build_track_arrays([prvsWP, waypoint])
+                if pending and len(leg_lats):
+                    # last item is same as first item in next leg
+                    lats[-1], longs[-1] = lats[-1][:-1], longs[-1][:-1]
+                    pending -= 1
+                lats.append(leg_lats)
+                longs.append(leg_longs)
+                pending += len(leg_lats)
+                if pending > chunk_points: # keep the last trackpoint, it may be redundant
+                    leg_lats, leg_longs = np.concatenate(lats), np.concatenate(longs)
+                    end = (pending - 1)//chunk_points*chunk_points
+                    for idx in range(0, end, chunk_points):
+                        yield leg_lats[idx:idx+chunk_points], leg_longs[idx:idx+chunk_points]
+                    lats, longs = [leg_lats[end:]], [leg_longs[end:]]
+                    pending -= end
+            prvsWP = waypoint
+        if pending:
+            yield np.concatenate(lats), np.concatenate(longs)
+
+    def iter_trackpoints(self, waypoints, chunk_points=CHUNKPOINTS):
+        """
+        Stream the trackpoints of the route defined in 'waypoints', one (lat, long) tuple each
+        """
+        for lats, longs in self.iter_tracks(waypoints, chunk_points):
+            yield from zip(lats.tolist(), longs.tolist())
+
     def build_route(self, route_name: str, waypoints: list):
         """
         build the tracks for the route defined in 'waypoints',
-        which is a list of waypoint tuples (lat, lon)
+        which is a list of waypoint tuples (lat, lon),
+        collects the trackpoints stream (see iter_tracks) into a list of tuples
         """
         route = {
             "name": route_name,
             "waypoints": waypoints,
-            "tracks": []
+            "tracks": list(self.iter_trackpoints(waypoints))
         }
-        prvsWP = None
-        for waypoint in waypoints:
-            if prvsWP: # not empty
-                # append tracks
-                tracks = self.build_tracks(prvsWP, waypoint)
-                if route["tracks"]: # not empty
-                    # last item is same as first item in next tracks list 
-                    del route["tracks"][-1]    # delete redundant item                     
-                route["tracks"].extend(tracks) # append next tracks list
-            prvsWP = waypoint
-        #
         return route
 
 
+# functions ========
+
+def get_central_angle(lat1, long1, lat2, long2, degrees=True):
+    """
+    Central angle (radians) between points on the globe, haversine formula
+    (well conditioned for short distances), scalars or NumPy arrays
+    """
+    if degrees:
+        lat1, long1, lat2, long2 = map(np.radians, (lat1, long1, lat2, long2))
+    h = np.sin((lat2 - lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((long2 - long1)/2)**2
+    return 2*np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+def get_unit_vectors(lats, longs):
+    """
+    Unit vectors (x, y, z) of points on the globe, latitudes and longitudes in radians
+    :return NumPy array 3 x points
+    """
+    return np.stack((np.cos(lats)*np.cos(longs), np.cos(lats)*np.sin(longs), np.sin(lats)))
+
+
 # main ========
 
 if __name__ == '__main__':
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+"""
+    Viewshed of observers (e.g. relay antennas) over the arena, stored in the database
+        XDraw sweep: ring by ring outward from the observer, the horizon of each cell is
+        interpolated from the two cells of the previous ring on the sight line (one pass,
+        vectorized per ring), 8 octants per observer, run in a process pool.
+        The workers read the DSM from the flat raster file (see Mmcache.export_raster),
+        mapped read-only, so all processes share one page cache copy.
+        Earth curvature with refraction lowers the distant terrain.
+    Result: raster table (see Dbsql.set_raster_rows), one value per arena cell,
+        the number of observers seeing a target at target height above ground (0: none).
+    Usage:
+        Viewshed.py [database] --observer LAT LONG [--observer LAT LONG ...] [--height M]
+                    [--target-height M] [--radius M] [--refraction K] [--name NAME]
+                    [--raster PATH] [--workers N]
+"""
+
+# packages ========
+
+from Dbsql import Dbsql
+from Dbcache import METERSPERDEGREE
+from Mmcache import Mmcache, export_raster, is_current
+from Lineofsight import REFRACTION
+from Route import EARTHRADIUS
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import sys
+import math
+import logging
+import time
+import argparse
+import numpy as np
+from decouple import config
+
+# constants ========
+
+HEIGHT = 10 # meters above ground, observer (antenna mast)
+TARGET_HEIGHT = 0 # meters above ground, target
+RADIUS = 30000 # meters
+NAME = "viewshed"
+OCTANTS = [(axis, s_major, s_minor) for axis in (0, 1) for s_major in (-1, 1) for s_minor in (-1, 1)]
+NOBLOCK = -1e6 # horizon of nodata cells (finite, interpolation)
+
+_raster = None # worker process: raster cache (mapped read-only)
+
+
+# functions ========
+
+def _init_worker(rasterpath):
+    """
+    process pool initializer: map the raster once per worker process
+    """
+    global _raster
+    _raster = Mmcache(rasterpath)
+
+def sweep_octant(observer, octant, rings, cell_size, radius):
+    """
+    XDraw sweep of one octant, rings 1 .. rings around the observer
+    observer: (rowId, colId, height above sea level, target height above ground)
+    octant: (major axis 0: rows 1: cols, major direction, minor direction)
+    cell_size: (meters per row, meters per col), radius: effective earth radius (None: flat)
+    :return NumPy bool array (rings+1 x rings+1, fewer rings at the arena edge), [ring, offset] True if visible
+    """
+    row0, col0, height, target = observer
+    axis, s_major, s_minor = octant
+    raster = _raster.raster
+    rows, cols = raster.shape
+    edge = (row0, rows - 1 - row0) if axis == 0 else (col0, cols - 1 - col0)
+    rings = min(rings, edge[s_major > 0]) # the arena ends in the major direction
+    visible = np.zeros((rings + 1, rings + 1), dtype=bool)
+    visible[0, 0] = True
+    horizon = None # previous ring, heights of the sight lines
+    for ring in range(1, rings + 1):
+        offsets = np.arange(ring + 1)
+        if axis == 0:
+            rowIds, colIds = np.full(ring + 1, row0 + s_major*ring), col0 + s_minor*offsets
+        else:
+            rowIds, colIds = row0 + s_minor*offsets, np.full(ring + 1, col0 + s_major*ring)
+        inside = (rowIds >= 0) & (rowIds < rows) & (colIds >= 0) & (colIds < cols)
+        values = np.full(ring + 1, _raster.nodata)
+        values[inside] = raster[rowIds[inside], colIds[inside]]
+        valid = values != _raster.nodata
+        terrain = np.where(valid, values, NOBLOCK).astype(np.float64)
+        if radius:
+            distances = ((rowIds - row0)*cell_size[0])**2 + ((colIds - col0)*cell_size[1])**2
+            terrain[valid] -= distances[valid]/(2*radius) # earth curvature
+        if horizon is None:
+            sight = np.full(ring + 1, NOBLOCK) # next to the observer
+        else:
+            # sight line through the previous ring (interpolated), extended to this ring
+            positions = offsets*(ring - 1)/ring
+            low = positions.astype(np.int64)
+            weights = positions - low
+            high = np.minimum(low + 1, ring - 1)
+            previous = horizon[low]*(1 - weights) + horizon[high]*weights
+            sight = height + (previous - height)*ring/(ring - 1)
+        visible[ring, :ring + 1] = valid & (terrain + target >= sight)
+        horizon = np.maximum(terrain, sight)
+    return visible
+
+def _sweep_task(index, observer, octant, rings, cell_size, radius):
+    """
+    process pool task: one octant of one observer
+    """
+    return index, octant, sweep_octant(observer, octant, rings, cell_size, radius)
+
+def compute_viewshed(dbpath, rasterpath, observers, height=HEIGHT, target_height=TARGET_HEIGHT,
+                     radius=RADIUS, refraction=REFRACTION, name=NAME, workers=None):
+    """
+    compute the viewshed of the observers ((lat, long) tuples) and store it in the database
+    (raster table 'name', replaced), the raster file is exported first if it is missing or
+    not exported from the current build of the database (see Mmcache.is_current)
+    :return NumPy array (arena rows x cols), number of observers seeing each cell
+    """
+    if not is_current(dbpath, rasterpath):
+        export_raster(dbpath, rasterpath)
+    _init_worker(rasterpath) # this process: geometry and observer elevations
+    gt = _raster.geotransform
+    rows, cols = _raster.row_len, _raster.col_len
+    effective = EARTHRADIUS/(1 - refraction) if refraction < 1 else None
+    counts = np.zeros((rows, cols), dtype=np.int16)
+    windows = {} # observer index: (observer cell, rings, visible cells of the window, octants pending)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rasterpath,)) as pool:
+        futures = []
+        for index, (lat, long) in enumerate(observers):
+            rowId = math.floor((lat - gt[3])*_raster.row_fctr)
+            colId = math.floor((long - gt[0])*_raster.col_fctr)
+            if not (0 <= rowId < rows and 0 <= colId < cols):
+                logging.warning("Viewshed: observer out of the arena: " + str((lat, long)))
+                continue
+            ground = int(_raster.raster[rowId, colId])
+            observer = (rowId, colId, (ground if ground != _raster.nodata else 0) + height, target_height)
+            cell_size = (abs(gt[5])*METERSPERDEGREE, gt[1]*METERSPERDEGREE*math.cos(math.radians(lat)))
+            rings = int(radius/min(cell_size))
+            windows[index] = [(rowId, colId, cell_size), rings, np.zeros((2*rings + 1, 2*rings + 1), dtype=bool), 8]
+            for octant in OCTANTS:
+                futures.append(pool.submit(_sweep_task, index, observer, octant, rings, cell_size, effective))
+        for future in as_completed(futures):
+            index, (axis, s_major, s_minor), visible = future.result()
+            (rowId, colId, cell_size), rings, window, _ = windows[index]
+            ring, offset = np.nonzero(visible)
+            if axis == 0:
+                window[rings + s_major*ring, rings + s_minor*offset] = True
+            else:
+                window[rings + s_minor*offset, rings + s_major*ring] = True
+            windows[index][3] -= 1
+            if windows[index][3] == 0: # all octants: clip to the radius and the arena, count
+                dr, dc = np.ogrid[-rings:rings + 1, -rings:rings + 1]
+                window &= (dr*cell_size[0])**2 + (dc*cell_size[1])**2 <= radius**2
+                top, left = rowId - rings, colId - rings
+                r0, c0 = max(top, 0), max(left, 0)
+                r1, c1 = min(rowId + rings + 1, rows), min(colId + rings + 1, cols)
+                counts[r0:r1, c0:c1] += window[r0 - top:r1 - top, c0 - left:c1 - left]
+                del windows[index]
+    info = {"observers": [list(observer) for observer in observers], "height": height,
+            "target_height": target_height, "radius": radius, "refraction": refraction}
+    covered = np.flatnonzero(counts.any(axis=1)) # rows above and below without visible cells are not stored
+    with Dbsql(dbpath) as sqldb:
+        sqldb.delete_raster(name)
+        if len(covered):
+            with sqldb.transaction():
+                sqldb.set_raster_rows(name, int(covered[0]), counts[covered[0]:covered[-1] + 1], info)
+    return counts
+
+
+# main code ==============================================
+
+def main(arguments):
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('database', help="Arena database", nargs='?', default=None)
+    parser.add_argument('-o', '--observer', help="Observer position (lat long)", nargs=2, type=float,
+                        action='append', required=True, metavar=('LAT', 'LONG'))
+    parser.add_argument('--height', help="Observer height above ground (meters)", default=HEIGHT, type=float)
+    parser.add_argument('-t', '--target-height', help="Target height above ground (meters)",
+                        default=TARGET_HEIGHT, type=float)
+    parser.add_argument('-r', '--radius', help="Viewshed radius (meters)", default=RADIUS, type=float)
+    parser.add_argument('-k', '--refraction', help="Coefficient of refraction", default=REFRACTION, type=float)
+    parser.add_argument('-n', '--name', help="Name of the raster in the database", default=NAME)
+    parser.add_argument('-x', '--raster', help="Raster file (exported if missing)", default=None)
+    parser.add_argument('-w', '--workers', help="Number of worker processes", default=None, type=int)
+    args = parser.parse_args(arguments)
+
+    dbpath = args.database or config("DB_FILENAME")
+    start = time.perf_counter()
+    counts = compute_viewshed(dbpath, args.raster or config("RASTER_FILENAME"), args.observer,
+                              args.height, args.target_height, args.radius, args.refraction,
+                              args.name, args.workers)
+    print("Viewshed '" + args.name + "': " + str(int(np.count_nonzero(counts))) + " visible cells, " +
+          str(round(time.perf_counter() - start, 1)) + " seconds")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
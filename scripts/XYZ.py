@@ -10,36 +10,48 @@ import math
 import logging
 import json
 import random 
+import itertools
+import numpy as np
+from Geotiff import Geotiff
+from Raster import Raster, VOID
 
 # define elevation matrix for COG-90 (accuracy: < 4 meters)
 EDGE = 1200 # matrix height (cols) and width (rows), equals cell size of 90 x 90 meters
 MTRX = EDGE * EDGE # number of elements in matrix
+CHUNK_ROWS = 100 # number of matrix rows parsed at once in bulk mode
 
 class XYZ:
-    def __init__(self, filename):
+    def __init__(self, filename, bulk=False, seed=None, quiet=False, stream=False):
         # build headers (fixed size)
         self.col_headers = [None]*EDGE # mutable
         self.row_headers = [None]*EDGE # mutable
-        # build 2 dimensional array (fixed size)
-        self.matrix = []  
-        rows, cols = EDGE, EDGE
-        for i in range(rows):
-            col = bytearray([]) # mutable
-            for j in range(cols):
-                # set all cols == -1, 2 bytes per element
-                col.append(255) # high byte (big endian)
-                col.append(255) # low byte  (big endian)
-            self.matrix.append(col)
-        # unit test values
+        # build 2 dimensional array (fixed size, one contiguous buffer, not in streaming mode)
+        self.matrix = None if stream else Raster(EDGE, EDGE)
+        # unit test values, random samples (reproducible with seed)
+        self.rng = random.Random(seed)
         self.uvalus = []
-        self.ucount = random.randrange(EDGE*100)
+        self.ucount = self.rng.randrange(EDGE*100)
+        self.quiet = quiet # no progress bar
+        # geotransform and nodata value (GeoTIFF mode only, see get_geotransform and get_meters)
+        self.geotransform = None
+        self.nodata = None
         # convert text file to database 
-        self.bounding_box = self.set_cells(filename) 
+        self.filename = filename
+        if stream:
+            self.bounding_box = None # set by iter_rows
+        elif filename.endswith(".tif"):
+            self.bounding_box = self.set_cells_geotiff(filename)
+        elif bulk:
+            self.bounding_box = self.set_cells_bulk(filename)
+        else:
+            self.bounding_box = self.set_cells(filename) 
 
     def progress(self, count, total=MTRX, suffix=''):
         """ 
             display progress bar in console
         """
+        if self.quiet:
+            return
         bar_len = 60
         filled_len = int(round(bar_len * count / float(total)))
         percents = round(100.0 * count / float(total), 3)
@@ -78,7 +90,8 @@ class XYZ:
             bb = "{}" # empty dictionary
         finally:
             file.close()
-            sys.stdout.write("\n")
+            if not self.quiet:
+                sys.stdout.write("\n")
             return bb
 
     def set_cell(self, row, col, line):
@@ -91,7 +104,6 @@ class XYZ:
             x = float(li[0])  # col index in floating format 
             y = float(li[1])  # row index in floating format 
             z = int(float(li[2])) # elevation converted (rounded) to int meters
-            z2b = z.to_bytes(2, byteorder='big') # elevation data up to 32'768 meters
 
             # update col headers ====
             if row == 0:
@@ -106,8 +118,7 @@ class XYZ:
                 self.row_headers[row] = y # update row index
 
             # update matrix
-            self.matrix[row][2*col] = z2b[0] # high byte, big endian
-            self.matrix[row][2*col+1] = z2b[1] # low byte, big endian 
+            self.matrix.set_cell(row, col, z) # big endian
 
             # update unit test
             self.ucount -= 1 # decrement
@@ -116,7 +127,7 @@ class XYZ:
                     "rowId": row, "colId": col,
                     "x": x, "y": y, "z": z
                 })
-                self.ucount = random.randrange(EDGE*100)
+                self.ucount = self.rng.randrange(EDGE*100)
             quit = False
         #
         except ValueError as err:
@@ -125,6 +136,207 @@ class XYZ:
         finally:
             return quit
         
+    def set_cells_bulk(self, filename):
+        """
+            read file and build matrix in the SQL database, NumPy bulk mode:
+            the text file is parsed in chunks of CHUNK_ROWS matrix rows,
+            the result is identical to set_cells (line by line)
+        """
+        try:
+            xs = np.empty((EDGE, EDGE), dtype=np.float64) # longitudes
+            ys = np.empty((EDGE, EDGE), dtype=np.float64) # latitudes
+            zs = np.empty((EDGE, EDGE), dtype=np.float64) # elevations
+            with open(filename, "r") as file:
+                self.progress(0)
+                for row in range(0, EDGE, CHUNK_ROWS):
+                    rows = min(CHUNK_ROWS, EDGE-row)
+                    lines = list(itertools.islice(file, rows*EDGE))
+                    if len(lines) < rows*EDGE:
+                        raise ValueError("Error in set_cells_bulk: premature end of file.")
+                    chunk = np.loadtxt(lines, dtype=np.float64, usecols=(0, 1, 2), ndmin=2)
+                    xs[row:row+rows] = chunk[:, 0].reshape(rows, EDGE)
+                    ys[row:row+rows] = chunk[:, 1].reshape(rows, EDGE)
+                    zs[row:row+rows] = chunk[:, 2].reshape(rows, EDGE)
+                    self.progress((row+rows)*EDGE)
+            self.set_cells_from_arrays(xs, ys, zs)
+            bb = self.get_bounding_box_string()
+        except ValueError as err:
+            logging.error(err.args)
+            bb = "{}" # empty dictionary
+        finally:
+            if not self.quiet:
+                sys.stdout.write("\n")
+        return bb
+
+    @property
+    def elevations(self):
+        """
+            elevations as 2 dimensional int16 array, a view on the matrix (no copy)
+        """
+        return self.matrix.to_array()
+
+    def set_cells_geotiff(self, filename):
+        """
+            read Copernicus GeoTIFF and build matrix in the SQL database,
+            the cell coordinates are the cell centers, as written by gdal_translate -of XYZ
+        """
+        try:
+            tif = Geotiff(filename)
+            if (tif.height, tif.width) != (EDGE, EDGE):
+                raise ValueError("Error in set_cells_geotiff: unexpected raster size "+str((tif.height, tif.width)))
+            if tif.geotransform is None:
+                raise ValueError("Error in set_cells_geotiff: missing georeference.")
+            gt = tif.geotransform
+            centers = np.arange(EDGE) + 0.5
+            xs = np.broadcast_to(gt[0] + centers*gt[1], (EDGE, EDGE)) # longitudes
+            ys = np.broadcast_to((gt[3] + centers*gt[5])[:, None], (EDGE, EDGE)) # latitudes
+            self.nodata = tif.nodata
+            self.set_cells_from_arrays(xs, ys, tif.read())
+            self.geotransform = gt
+            self.progress(MTRX)
+            bb = self.get_bounding_box_string()
+        except (ValueError, OSError) as err:
+            logging.error(err.args)
+            bb = "{}" # empty dictionary
+        finally:
+            if not self.quiet:
+                sys.stdout.write("\n")
+        return bb
+
+    def set_cells_from_arrays(self, xs, ys, zs):
+        """
+            set headers, matrix and unit tests from EDGE x EDGE arrays with
+            longitudes (X), latitudes (Y) and elevations (Z)
+        """
+        # update headers ====
+        self.col_headers = xs[0].tolist()
+        self.row_headers = ys[:, 0].tolist()
+        self.check_col_headers(1, xs[1:])
+        # update matrix, elevation converted (truncated) to int meters, big endian ====
+        self.matrix = Raster.from_array(self.get_meters(zs))
+        # update unit tests ====
+        self.set_unit_tests(0, xs, ys, self.elevations)
+        pass
+
+    def get_meters(self, zs):
+        """
+            elevations truncated to integer meters, cells with the nodata value of the GeoTIFF
+            (and NaN) are VOID
+        """
+        meters = np.trunc(zs)
+        void = np.isnan(zs) if meters.dtype.kind == "f" else np.zeros(zs.shape, dtype=bool)
+        if self.nodata is not None:
+            void |= zs == self.nodata
+        meters[void] = VOID
+        return meters
+
+    def check_col_headers(self, row, xs):
+        """
+            compare the longitudes of a band of rows (starting at matrix row 'row') with the column headers
+        """
+        mismatch = np.nonzero(xs != np.asarray(self.col_headers))
+        if mismatch[0].size:
+            r, c = int(mismatch[0][0]), int(mismatch[1][0])
+            logging.warning('XYZ: column mismatch: '+str(self.col_headers[c])+" expected, got "+str(xs[r, c])
+                            +" in row "+str(row+r)+" ("+str(mismatch[0].size)+" cells)")
+        pass
+
+    def set_unit_tests(self, row, xs, ys, zs):
+        """
+            add random unit tests from a band of rows (starting at matrix row 'row'),
+            same random countdown as set_cell, continued from band to band
+        """
+        cells = zs.size
+        cell = self.ucount # position of the next sample in this band (1 is first cell)
+        while self.ucount > 0 and cell <= cells:
+            r, c = divmod(cell-1, EDGE)
+            self.uvalus.append({
+                "rowId": row+r, "colId": c,
+                "x": float(xs[r, c]), "y": float(ys[r, c]), "z": int(zs[r, c])
+            })
+            self.ucount = self.rng.randrange(EDGE*100)
+            cell += self.ucount
+        if self.ucount > 0:
+            self.ucount = cell - cells # countdown into the next band
+        pass
+
+    # streaming ========
+
+    def _iter_text_bands(self):
+        """
+            parse the XYZ text file, one matrix row at a time
+            :yield (row, longitudes, latitudes, elevations), arrays with one row
+        """
+        with open(self.filename, "r") as file:
+            for row in range(EDGE):
+                lines = list(itertools.islice(file, EDGE))
+                if len(lines) < EDGE:
+                    raise ValueError("Error in iter_rows: premature end of file.")
+                cells = np.loadtxt(lines, dtype=np.float64, usecols=(0, 1, 2), ndmin=2)
+                yield row, cells[None, :, 0], cells[None, :, 1], cells[None, :, 2]
+
+    def _iter_geotiff_bands(self):
+        """
+            decode the GeoTIFF, one band of internal tiles (or one strip) at a time
+            :yield (row, longitudes, latitudes, elevations), arrays with the rows of the band
+        """
+        tif = Geotiff(self.filename)
+        if (tif.height, tif.width) != (EDGE, EDGE):
+            raise ValueError("Error in iter_rows: unexpected raster size "+str((tif.height, tif.width)))
+        if tif.geotransform is None:
+            raise ValueError("Error in iter_rows: missing georeference.")
+        gt = tif.geotransform
+        self.geotransform = gt
+        self.nodata = tif.nodata
+        xs = gt[0] + (np.arange(EDGE) + 0.5)*gt[1] # longitudes
+        for row, zs in tif.iter_bands():
+            ys = gt[3] + (np.arange(row, row+zs.shape[0]) + 0.5)*gt[5] # latitudes
+            shape = zs.shape
+            yield row, np.broadcast_to(xs, shape), np.broadcast_to(ys[:, None], shape), zs
+
+    def iter_rows(self):
+        """
+            parse the file row by row (streaming mode, XYZ(filename, stream=True)),
+            nothing is kept apart from the headers and the unit tests
+            :yield (latitude, row), the row is big endian elevations (memoryview)
+            the bounding box is set when the iterator is exhausted
+        """
+        if self.filename.endswith(".tif"):
+            bands = self._iter_geotiff_bands()
+        else:
+            bands = self._iter_text_bands()
+        try:
+            self.progress(0)
+            for row, xs, ys, zs in bands:
+                if row == 0:
+                    self.col_headers = xs[0].tolist()
+                self.check_col_headers(row, xs)
+                band = Raster.from_array(self.get_meters(zs))
+                self.set_unit_tests(row, xs, ys, band.to_array())
+                for r in range(len(band)):
+                    latitude = float(ys[r, 0])
+                    self.row_headers[row+r] = latitude
+                    yield latitude, band[r]
+                self.progress((row+len(band))*EDGE)
+            self.bounding_box = self.get_bounding_box_string()
+        except (ValueError, OSError) as err:
+            logging.error(err.args)
+            raise
+        finally:
+            if not self.quiet:
+                sys.stdout.write("\n")
+
+    def get_geotransform(self):
+        """
+            Get the GDAL style geotransform of the matrix: from the GeoTIFF,
+            else derived from the headers (cell centers)
+        """
+        if self.geotransform is not None:
+            return self.geotransform
+        dx = (self.col_headers[-1] - self.col_headers[0])/(EDGE - 1)
+        dy = (self.row_headers[-1] - self.row_headers[0])/(EDGE - 1)
+        return (self.col_headers[0] - dx/2, dx, 0.0, self.row_headers[0] - dy/2, 0.0, dy)
+
     def get_bounding_box_string(self):
         """
             Get the json formated string for the bounding box of the matrix
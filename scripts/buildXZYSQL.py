@@ -4,18 +4,47 @@
     Build XYZ file from Copernicus data residing on AWS S3 &
     Build SQLite3 database using XYZ file data
         Database file is in config("TILE_FOLDER"), filename 'arena.db'
+    Usage:
+        buildXZYSQL.py [--workers N] [--stream] [--incremental] [--bulk | --fast] [--layout rows|chunks] [--codec CODEC] [--overviews N] [--export]
+            --workers: number of worker processes reading the tiles (default 1, serial build)
+            --stream: write the rows to the database while parsing, with bounded memory
+            --incremental: keep tiles and database, (re)build new and changed tiles only
+            --bulk: bulk-load mode, WAL journal and a large page cache
+            --fast: bulk-load mode without fsync (not safe if the system loses power)
+            --layout: storage layout of a new database, arena-wide rows (default) or chunks
+            --codec: compression of the rows or chunks of a new database, e.g. delta+zlib (default raw)
+            --overviews: build N overview levels (2x, 4x ... downsampled, max/min/mean), default 4, 0 is none,
+                incremental builds rebuild the overview cells of the (re)built tiles only
+            --export: export the arena to a flat raster file (config("RASTER_FILENAME")), see Mmcache
 """
 
 # packages ========
 
 from BoundingBox import BoundingBox 
-from XYZ import XYZ
+from XYZ import XYZ, EDGE
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from contextlib import contextmanager
+from queue import Queue
+from threading import Thread
 import subprocess
 import os
+import sys
 import shutil
 import logging
+import argparse
+import hashlib
+import numpy as np
 from decouple import config
-from scripts.Dbsql import Dbsql
+from scripts.Dbsql import Dbsql, BULK_CACHE_BYTES, LAYOUT_ROWS, LAYOUT_CHUNKS
+from scripts.Codec import CODECS
+from scripts.Mmcache import export_raster
+from scripts.Raster import VOID
+
+# constants ========
+
+OVERVIEW_BAND = 240 # source rows per band of the overview build (even)
+OVERVIEW_LEVELS = 4 # default overview levels (2x .. 16x), corridor queries read the 'max' overviews
 
 # functions ========
 
@@ -53,7 +82,151 @@ def get_xyz_file(tilename):
         print(out.stdout)
     return destination
 
-def build_database(xdb, bb):
+def get_tif_file(tilename):
+    """
+        Copernicus tile (GeoTIFF), read natively by XYZ without the XYZ text file
+    """
+    return config("TILE_FOLDER")+tilename+"/"+tilename+".tif"
+
+def get_checksum(path):
+    """
+        Content checksum (sha256) of a tile file
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def load_tile(tile, native=True, quiet=False):
+    """
+        Download, convert and parse one tile (runs in a worker process for parallel builds)
+        The unit test samples are seeded with the tile name, so builds are reproducible.
+        :return: (path, XYZ object)
+    """
+    tilename = tile["fldr"]
+    # build tile
+    aws_path = get_aws_tile(tilename)
+    if not quiet:
+        print("Downloaded from AWS to file: "+aws_path)
+    # build XYZ file (or use GeoTIFF directly)
+    if native:
+        xyz_path = get_tif_file(tilename)
+    else:
+        xyz_path = get_xyz_file(tilename)
+    # build XYZ object
+    return xyz_path, XYZ(xyz_path, bulk=True, seed=tilename, quiet=quiet)
+
+def load_tiles(tiles, native=True, workers=1):
+    """
+        Generate (tile, path, XYZ object) in the order of the tiles,
+        parsed in a process pool with 'workers' processes if workers > 1.
+        At most 2 x workers parsed tiles are waiting for the database writer.
+    """
+    if workers <= 1:
+        for tile in tiles:
+            yield (tile,) + load_tile(tile, native)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for tile in tiles:
+            pending.append((tile, executor.submit(load_tile, tile, native, True)))
+            if len(pending) >= 2*workers:
+                done_tile, future = pending.popleft()
+                yield (done_tile,) + future.result()
+        while pending:
+            done_tile, future = pending.popleft()
+            yield (done_tile,) + future.result()
+
+@contextmanager
+def open_database(xdb, bb, bulk=False, fast=False, layout=None, codec=None):
+    """
+        Open the database for a build (one connection for all tiles),
+        bulk-load mode: page cache for all rows of one row of tiles, durable checkpoint at the end
+        layout, codec: storage layout (rows or chunks) and codec of a new database
+    """
+    cache_bytes = max(BULK_CACHE_BYTES, int(bb.max_bytes_in_row * bb.pixels))
+    with Dbsql(xdb, bulk=bulk, fast=fast, cache_bytes=cache_bytes, layout=layout, codec=codec) as sqldb:
+        yield sqldb
+        if bulk or fast:
+            sqldb.end_bulk_load()
+
+def read_ahead(iterator, depth=16):
+    """
+        Run the iterator (parser) in a thread, at most 'depth' items ahead of the consumer,
+        so parsing overlaps with the database writes
+    """
+    queue = Queue(maxsize=depth)
+    done = object() # end of iteration marker
+
+    def produce():
+        try:
+            for item in iterator:
+                queue.put(item)
+            queue.put(done)
+        except Exception as err:
+            queue.put(err) # re-raised in the consumer
+
+    Thread(target=produce, daemon=True).start()
+    while True:
+        item = queue.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+def build_database_stream(xdb, bb, native=True, bulk=False, fast=False, layout=None, codec=None):
+    """
+        Build database following the pattern of build_database, streaming mode:
+            each tile is parsed row by row (XYZ.iter_rows) and the rows are
+            written to the database as they arrive, only a few rows are in memory
+    """
+    previous_ll_bottom = None
+    previous_ll_left = None
+    with open_database(xdb, bb, bulk, fast, layout, codec) as sqldb:
+        for tile in bb.tiles:
+
+            tilename = tile["fldr"]
+            tile_bottom = tile["bottom"]
+            tile_left = tile["left"]
+            print("Tile:", tilename, "LL coordinate:", str((tile_bottom, tile_left)))
+
+            # build tile
+            aws_path = get_aws_tile(tilename)
+            print("Downloaded from AWS to file: "+aws_path)
+            if native:
+                xyz_path = get_tif_file(tilename)
+            else:
+                xyz_path = get_xyz_file(tilename)
+            xyz_obj = XYZ(xyz_path, seed=tilename, stream=True)
+
+            # follow pattern and build database
+            pixel_top = tile["pixel_top"]
+            pixel_left = tile["pixel_left"]
+            with sqldb.transaction(): # one transaction per tile
+                # build database pattern: left(W) to right(E), and top(N) to bottom(S),
+                # use cases: empty database, one tile to the right, first tile below (new tile row)
+                # (stream_rows sets or adds each row, see Dbsql)
+                if not ((previous_ll_bottom is None and previous_ll_left is None) or
+                        (tile_bottom == previous_ll_bottom and tile_left == previous_ll_left + 1) or
+                        tile_bottom == previous_ll_bottom - 1):
+                    # undefined state, sequence, pattern
+                    raise AssertionError("Lower Left (LL) does not follow proper pattern: W to E, N to S.")
+                latitudes = sqldb.stream_rows(read_ahead(xyz_obj.iter_rows()), pixel_top, pixel_left,
+                                              bb.max_bytes_in_row)
+                if not latitudes:
+                    raise AssertionError("Tile cannot be written: " + xyz_path) # rollback tile
+                sqldb.put_geotransform(xyz_obj.get_geotransform(), pixel_top, pixel_left, EDGE, EDGE)
+                sqldb.set_tile_status(tilename, xyz_path, xyz_obj.bounding_box, "complete",
+                                      get_checksum(get_tif_file(tilename)))
+            # end with
+            previous_ll_bottom = tile_bottom
+            previous_ll_left = tile_left
+        pass  # end for
+    print("Finished building database (success).")
+
+def build_database(xdb, bb, native=True, workers=1, bulk=False, fast=False, layout=None, codec=None):
     """
         Build database following pattern:
             start at northwestern tile and pixel
@@ -61,85 +234,280 @@ def build_database(xdb, bb):
                 pixels: 1200 x 1200 (approx 90 meters)
             tiles from left (west) to right (east), then
                   from top (north) to bottom (south)
+        native: read the GeoTIFF tiles directly, else convert with gdal_translate
+        workers: number of processes parsing tiles, the database is written by this
+            process only, in the same order as the serial build (identical result)
+        layout, codec: storage layout, arena-wide rows or chunks (see Dbsql), and codec (see Codec)
     """
     previous_ll_bottom = None
     previous_ll_left = None
-    for tile in bb.tiles:
+    with open_database(xdb, bb, bulk, fast, layout, codec) as sqldb:
+        for tile, xyz_path, xyz_obj in load_tiles(bb.tiles, native, workers):
 
-        tilename = tile["fldr"]
-        tile_bottom = tile["bottom"]
-        tile_left = tile["left"]
-        print("Tile:", tilename, "LL coordinate:", str((tile_bottom, tile_left)))
+            tilename = tile["fldr"]
+            tile_bottom = tile["bottom"]
+            tile_left = tile["left"]
+            print("Tile:", tilename, "LL coordinate:", str((tile_bottom, tile_left)))
 
-        # build tile
-        aws_path = get_aws_tile(tilename)
-        print("Downloaded from AWS to file: "+aws_path)
+            # follow pattern and build database
+            pixel_top = tile["pixel_top"]
+            pixel_left = tile["pixel_left"]
+            with sqldb.transaction(): # one transaction per tile
+                # build database pattern: left(W) to right(E), and top(N) to bottom(S)
+                if (previous_ll_bottom is None) and (previous_ll_left is None):
+                    # use case: empty database
+                    written = sqldb.set_rows(xyz_obj.matrix, pixel_top, pixel_left, bb.max_bytes_in_row)
+                elif (tile_bottom == previous_ll_bottom) and (tile_left == previous_ll_left + 1):
+                    # use case: one tile to the right
+                    written = sqldb.add_rows(xyz_obj.matrix, pixel_top, pixel_left, bb.max_bytes_in_row)
+                    # note: rows_offset does not change
+                elif tile_bottom == previous_ll_bottom - 1:
+                    # use case: first tile below (new tile row)
+                    written = sqldb.set_rows(xyz_obj.matrix, pixel_top, pixel_left, bb.max_bytes_in_row)
+                else:
+                    # undefined state, sequence, pattern
+                    raise AssertionError("Lower Left (LL) does not follow proper pattern: W to E, N to S.")
+                # end if
+                if not written:
+                    raise AssertionError("Tile cannot be written: " + xyz_path) # rollback tile
+                sqldb.put_geotransform(xyz_obj.get_geotransform(), pixel_top, pixel_left, EDGE, EDGE)
+                sqldb.set_tile_status(tilename, xyz_path, xyz_obj.bounding_box, "complete",
+                                      get_checksum(get_tif_file(tilename)))
+            # end with
+            previous_ll_bottom = tile_bottom
+            previous_ll_left = tile_left
+        pass  # end for
+    print("Finished building database (success).")
 
-        # build XYZ file
-        xyz_path = get_xyz_file(tilename)
+def check_arena_layout(xdb, bb):
+    """
+        An existing database can be extended incrementally if the top left (NW) corner
+        is unchanged and the arena does not shrink (same pixel offsets for all tiles)
+    """
+    with Dbsql(xdb) as sqldb:
+        if not sqldb.get_metadata_items():
+            return True # empty database
+        abb = sqldb.get_arena_bounding_box() # cell centers
+    return (round(abb["top"]) == bb.top and round(abb["left"]) == bb.left and
+            round(abb["bottom"]) >= bb.bottom and round(abb["right"]) <= bb.right)
 
-        # build XYZ object
-        xyz_obj = XYZ(xyz_path)
-
-        # follow pattern and build database
-        pixel_top = tile["pixel_top"]
-        pixel_left = tile["pixel_left"]
-        with Dbsql(xdb) as sqldb:
-            # build database pattern: left(W) to right(E), and top(N) to bottom(S)
-            if (previous_ll_bottom is None) and (previous_ll_left is None):
-                # use case: empty database
-                sqldb.set_row_headers(xyz_obj.row_headers)
-                sqldb.set_col_headers(xyz_obj.col_headers)
-                sqldb.set_rows(xyz_obj.matrix, pixel_top, pixel_left, bb.max_bytes_in_row)
-            elif (tile_bottom == previous_ll_bottom) and (tile_left == previous_ll_left + 1):
-                # use case: one tile to the right
-                sqldb.add_col_headers(xyz_obj.col_headers)
-                sqldb.add_rows(xyz_obj.matrix, pixel_top, pixel_left, bb.max_bytes_in_row)
-                # note: rows_offset does not change
-            elif tile_bottom == previous_ll_bottom - 1:
-                # use case: first tile below (new tile row)
-                sqldb.add_row_headers(xyz_obj.row_headers)
-                sqldb.set_rows(xyz_obj.matrix, pixel_top, pixel_left, bb.max_bytes_in_row)
+def build_database_incremental(xdb, bb, native=True, workers=1, bulk=False, fast=False, layout=None, codec=None):
+    """
+        Build database incrementally, tile by tile in the pattern of build_database:
+            tiles which are complete and unchanged (same checksum) are skipped,
+            new, changed and interrupted tiles are (re)written,
+            the status of each tile is recorded in the metadata table,
+            in the same transaction as the rows of the tile
+        :return list of the tiles (re)built
+    """
+    if os.path.exists(xdb) and not check_arena_layout(xdb, bb):
+        logging.warning("Arena layout changed, full rebuild of database: " + xdb)
+        print("Arena layout changed, full rebuild.")
+        os.remove(xdb)
+    # find new, changed or interrupted tiles
+    todo = []
+    checksums = {}
+    with Dbsql(xdb) as sqldb:
+        for tile in bb.tiles:
+            tilename = tile["fldr"]
+            get_aws_tile(tilename)
+            checksums[tilename] = get_checksum(get_tif_file(tilename))
+            status, checksum = sqldb.get_tile_status(tilename)
+            if status == "complete" and checksum == checksums[tilename]:
+                print("Tile:", tilename, "unchanged, skipped.")
             else:
-                # undefined state, sequence, pattern
-                raise AssertionError("Lower Left (LL) does not follow proper pattern: W to E, N to S.")
-            # end if
-            sqldb.set_metadata_item(xyz_path, xyz_obj.bounding_box)
-        # end with
-        previous_ll_bottom = tile_bottom
-        previous_ll_left = tile_left
-    pass  # end for
-    print("Finished building database (success).")
+                todo.append(tile)
+    # (re)build tiles
+    with open_database(xdb, bb, bulk, fast, layout, codec) as sqldb:
+        for tile, xyz_path, xyz_obj in load_tiles(todo, native, workers):
+            tilename = tile["fldr"]
+            print("Tile:", tilename, "LL coordinate:", str((tile["bottom"], tile["left"])))
+            if xyz_obj.bounding_box == "{}":
+                raise AssertionError("Tile cannot be read: " + xyz_path)
+            pixel_top = tile["pixel_top"]
+            pixel_left = tile["pixel_left"]
+            with sqldb.transaction(): # one transaction per tile
+                if not sqldb.put_rows(xyz_obj.matrix, pixel_top, pixel_left, bb.max_bytes_in_row):
+                    raise AssertionError("Tile cannot be written: " + xyz_path)
+                sqldb.put_geotransform(xyz_obj.get_geotransform(), pixel_top, pixel_left, EDGE, EDGE)
+                sqldb.set_tile_status(tilename, xyz_path, xyz_obj.bounding_box, "complete", checksums[tilename])
+    print("Finished building database (success), tiles (re)built: " + str(len(todo)))
+    return todo
+
+def downsample(maxs, mins, means):
+    """
+        Downsample 2 x 2 cells to one cell (maximum, minimum and mean of the cells with data),
+        odd rows or columns at the edges are padded by repeating the last row or column,
+        void cells are ignored, a cell is void if all 4 cells are void
+    """
+    pad = ((0, maxs.shape[0] % 2), (0, maxs.shape[1] % 2))
+    rows, cols = (maxs.shape[0] + pad[0][1])//2, (maxs.shape[1] + pad[1][1])//2
+    maxs, mins, means = [np.pad(a, pad, mode="edge").reshape(rows, 2, cols, 2).astype(np.int32)
+                         for a in (maxs, mins, means)]
+    valid = maxs != VOID
+    counts = valid.sum(axis=(1, 3))
+    void = counts == 0
+    stats = (np.where(valid, maxs, np.iinfo(np.int16).min).max(axis=(1, 3)),
+             np.where(valid, mins, np.iinfo(np.int16).max).min(axis=(1, 3)),
+             np.round(np.where(valid, means, 0).sum(axis=(1, 3))/np.maximum(counts, 1)))
+    return tuple(np.where(void, VOID, stat) for stat in stats)
+
+def get_overview_shape(shape, level):
+    """
+        Shape (rows, cols) of one overview level of the arena (shape), 0 is the full resolution
+    """
+    return -(-shape[0] // 2**level), -(-shape[1] // 2**level) # ceiling
+
+def get_overview_levels(shape, levels):
+    """
+        Overview levels 1 .. levels of the arena (shape), up to a single cell
+    """
+    return [level for level in range(1, levels + 1) if max(get_overview_shape(shape, level - 1)) >= 2]
+
+def check_overviews(sqldb, levels, shape):
+    """
+        The overview levels of the database match the arena (all levels, all rows and columns),
+        so the overviews of changed tiles can be rebuilt in place
+    """
+    stored = sqldb.get_overview_levels()
+    for level in levels:
+        rows, cols = get_overview_shape(shape, level)
+        if (level not in stored or len(sqldb.get_overview_row(level, rows - 1)) != 2*cols or
+                len(sqldb.get_overview_row(level, rows))):
+            return False
+    return True
+
+def build_overview_window(sqldb, level, window, shape, band=OVERVIEW_BAND):
+    """
+        Build the cells of one overview level covering a window of the arena
+        (top, left, bottom, right: pixel rows and columns) from the level below, band by band,
+        cells of partial rows are merged into the stored rows
+    """
+    src_rows, src_cols = get_overview_shape(shape, level - 1)
+    scale = 2**level # pixels per cell of this level
+    top = window[0] // scale * 2 # source cells, 2 x 2 cells per cell
+    left = window[1] // scale * 2
+    bottom = min(-(-window[2] // scale) * 2, src_rows)
+    right = min(-(-window[3] // scale) * 2, src_cols)
+    for first in range(top, bottom, band):
+        ids = range(first, min(first + band, bottom))
+        if level == 1:
+            base = np.stack([np.frombuffer(sqldb.get_row(idx), dtype=">i2")[left:right] for idx in ids])
+            stats = (base, base, base)
+        else:
+            stats = tuple(np.stack([np.frombuffer(sqldb.get_overview_row(level - 1, idx, stat), dtype=">i2")[left:right]
+                                    for idx in ids]).astype(np.int32) for stat in ("max", "min", "mean"))
+        stats = downsample(*stats)
+        if left > 0 or right < src_cols:
+            # merge into the stored rows of this level
+            stored = tuple(np.stack([np.frombuffer(sqldb.get_overview_row(level, first // 2 + idx, stat), dtype=">i2")
+                                     for idx in range(len(stats[0]))]).astype(np.int32) for stat in ("max", "min", "mean"))
+            for cells, rows in zip(stats, stored):
+                rows[:, left // 2:left // 2 + cells.shape[1]] = cells
+            stats = stored
+        if not sqldb.set_overview_rows(level, first // 2, *stats):
+            raise AssertionError("Overview level cannot be written: " + str(level))
+
+def build_overviews(xdb, levels, band=OVERVIEW_BAND, tiles=None):
+    """
+        Build the overview levels 1 .. levels (factor 2, 4, 8 ...) of the arena,
+        each level from the level below, band by band (bounded memory),
+        one transaction per level,
+        tiles: rebuild only the overview cells of these tiles (pixel_top, pixel_left), e.g. the
+            tiles of an incremental build, none if the list is empty, all cells if the stored
+            levels do not match the arena (levels added, arena grown)
+    """
+    with Dbsql(xdb) as sqldb:
+        shape = sqldb.get_shape()
+        levels = get_overview_levels(shape, levels)
+        if tiles is not None and check_overviews(sqldb, levels, shape):
+            windows = [(tile["pixel_top"], tile["pixel_left"], tile["pixel_top"] + EDGE, tile["pixel_left"] + EDGE)
+                       for tile in tiles]
+            for window in windows:
+                for level in levels:
+                    with sqldb.transaction():
+                        build_overview_window(sqldb, level, window, shape, band)
+            print("Overview levels", len(levels), "(re)built for tiles:", str(len(windows)))
+            return
+        for level in levels:
+            with sqldb.transaction():
+                build_overview_window(sqldb, level, (0, 0) + tuple(shape), shape, band)
+            print("Overview level", level, "(" + str(2**level) + "x):", str(get_overview_shape(shape, level)))
 
 # main code ==============================================
 
-# remove existing folders and files
-clean_up_dir(config("TILE_FOLDER"))
-logfile = config("LOG_FILENAME")
-if os.path.exists(logfile):
-    os.remove(logfile) # if it exists
-xdb_path = config("DB_FILENAME")
-if os.path.exists(xdb_path):
-    os.remove(xdb_path) # if it exists
-
-# setup logging ====
-logging.basicConfig(
-    level=logging.DEBUG, 
-    format='%(asctime)s %(levelname)s %(message)s',
-    datefmt='%H:%M:%S',
-    handlers=[logging.FileHandler(logfile)])
-logging.debug('Start new logging session.')
-
-# set the bounding box for the operating area, all values rounded to one degree
-bounding_box = BoundingBox(
-    north=float(config("ARENA_NORTH")),
-    south=float(config("ARENA_SOUTH")),
-    west=float(config("ARENA_WEST")),
-    east=float(config("ARENA_EAST"))
-)
-print("Bounding Box:", bounding_box.top, bounding_box.bottom, bounding_box.left, bounding_box.right)
-print("Tiles:", str(bounding_box.number_of_tiles))
-
-# build ====
-build_database(xdb_path, bounding_box)
-exit(0)
+def main(arguments):
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-w', '--workers', help="Number of worker processes reading the tiles",
+                        default=1, type=int)
+    parser.add_argument('-s', '--stream', help="Write rows while parsing (bounded memory, serial)",
+                        action='store_true')
+    parser.add_argument('-i', '--incremental', help="Keep tiles and database, (re)build changed tiles only",
+                        action='store_true')
+    parser.add_argument('-b', '--bulk', help="Bulk-load mode (WAL journal, large page cache)",
+                        action='store_true')
+    parser.add_argument('-f', '--fast', help="Bulk-load mode without fsync (synchronous=OFF)",
+                        action='store_true')
+    parser.add_argument('-l', '--layout', help="Storage layout of a new database",
+                        choices=[LAYOUT_ROWS, LAYOUT_CHUNKS], default=None)
+    parser.add_argument('-c', '--codec', help="Compression of the rows or chunks of a new database",
+                        choices=CODECS, default=None)
+    parser.add_argument('-o', '--overviews', help="Number of overview levels (2x, 4x ... downsampled)",
+                        default=OVERVIEW_LEVELS, type=int)
+    parser.add_argument('-x', '--export', help="Export the arena to a flat raster file (memory-mapped queries)",
+                        action='store_true')
+    args = parser.parse_args(arguments)
+
+    # remove existing folders and files
+    logfile = config("LOG_FILENAME")
+    xdb_path = config("DB_FILENAME")
+    if not args.incremental:
+        clean_up_dir(config("TILE_FOLDER"))
+        if os.path.exists(logfile):
+            os.remove(logfile) # if it exists
+        if os.path.exists(xdb_path):
+            os.remove(xdb_path) # if it exists
+
+    # setup logging ====
+    logging.basicConfig(
+        level=logging.DEBUG, 
+        format='%(asctime)s %(levelname)s %(message)s',
+        datefmt='%H:%M:%S',
+        handlers=[logging.FileHandler(logfile)])
+    logging.debug('Start new logging session.')
+
+    # set the bounding box for the operating area, all values rounded to one degree
+    bounding_box = BoundingBox(
+        north=float(config("ARENA_NORTH")),
+        south=float(config("ARENA_SOUTH")),
+        west=float(config("ARENA_WEST")),
+        east=float(config("ARENA_EAST"))
+    )
+    print("Bounding Box:", bounding_box.top, bounding_box.bottom, bounding_box.left, bounding_box.right)
+    print("Tiles:", str(bounding_box.number_of_tiles))
+
+    # build ====
+    native = config("NATIVE_READER", default=True, cast=bool)
+    tiles = None # all tiles
+    if args.incremental:
+        tiles = build_database_incremental(xdb_path, bounding_box, native=native, workers=args.workers,
+                                   bulk=args.bulk, fast=args.fast, layout=args.layout, codec=args.codec)
+    elif args.stream:
+        build_database_stream(xdb_path, bounding_box, native=native, bulk=args.bulk, fast=args.fast,
+                              layout=args.layout, codec=args.codec)
+    else:
+        build_database(xdb_path, bounding_box, native=native, workers=args.workers,
+                       bulk=args.bulk, fast=args.fast, layout=args.layout, codec=args.codec)
+    if args.overviews > 0:
+        build_overviews(xdb_path, args.overviews, tiles=tiles)
+    if args.export:
+        raster_path = config("RASTER_FILENAME")
+        rows, cols = export_raster(xdb_path, raster_path)
+        print("Exported raster "+str((rows, cols))+" to file: "+raster_path)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
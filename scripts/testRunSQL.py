@@ -31,17 +31,16 @@ try:
         metadata = dbcache.dbsql.get_arena_bounding_box()
         route = Route(metadata)
         waypoints = [ cityZug, cityBaar, cityCham ]
-        tracks = route.build_route('Zug-Baar-Cham', waypoints)
         #
-        # test database elevation profile
+        # test database elevation profile, streamed (trackpoints -> flight information)
         print("Meters above sea level:")
-        for track in tracks["tracks"]:
-            elevation = dbcache.get_flight_information( track[0], track[1])
+        for lat, long, elevation in dbcache.iter_flight_information(route.iter_tracks(waypoints)):
             # print current coordinates, (cell elevation, next cell elevation, heading, compass)
-            print(  f'{track[0]:.6f}'+', '+f'{track[1]:.6f}'+', '+str(elevation))
+            print(  f'{lat:.6f}'+', '+f'{long:.6f}'+', '+str(elevation))
         pass
+        print("Cache statistics:", dbcache.get_cache_statistics())
     logging.debug('End unit test for database.')
     exit(0)
 except Exception as err:
-    logging.error("Test route, unknown error: " + err.args)
+    logging.error("Test route, unknown error: " + str(err.args))
     exit(1)
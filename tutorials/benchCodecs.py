@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+    report the compression ratio and the decode cost of each codec (scripts/Codec.py),
+    for the rows and for the chunks of an existing arena database
+    Usage:
+        benchCodecs.py [database] [--rows N]
+            database: arena database (default config("DB_FILENAME"))
+            --rows: number of arena rows to sample, from the top (default 1200)
+"""
+
+# packages ========
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from decouple import config
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from Dbsql import Dbsql, CHUNK_EDGE
+from Codec import CODECS, encode, decode
+
+# functions ========
+
+def get_arena(dbpath, rows):
+    """
+    read the top rows of the arena (any layout or codec)
+    :return numpy array (rows x cols), big endian int16
+    """
+    with Dbsql(dbpath, readonly=True) as sqldb:
+        blobs = [bytes(sqldb.get_row(row_id)) for row_id in range(min(rows, sqldb.get_shape()[0]))]
+    width = min(map(len, blobs)) # cells of complete rows only
+    return np.frombuffer(b"".join(blob[:width] for blob in blobs), dtype=">i2").reshape(len(blobs), -1)
+
+def get_blocks(arena):
+    """
+    split the arena into rows and chunks
+    :return dictionary {block type: list of bytes}
+    """
+    rows, cols = arena.shape
+    chunks = [arena[i:i+CHUNK_EDGE, j:j+CHUNK_EDGE].tobytes()
+              for i in range(0, rows - rows % CHUNK_EDGE, CHUNK_EDGE)
+              for j in range(0, cols - cols % CHUNK_EDGE, CHUNK_EDGE)]
+    return {"row": [row.tobytes() for row in arena], "chunk": chunks}
+
+def bench(codec, blocks):
+    """
+    encode and decode all blocks with one codec
+    :return (ratio raw/encoded, encode ms per block, decode ms per block)
+    """
+    start = time.perf_counter()
+    encoded = [encode(codec, block) for block in blocks]
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for blob in encoded:
+        decode(codec, blob)
+    decode_time = time.perf_counter() - start
+    raw_bytes = sum(map(len, blocks))
+    encoded_bytes = sum(map(len, encoded))
+    return raw_bytes/encoded_bytes, 1000*encode_time/len(blocks), 1000*decode_time/len(blocks)
+
+# main ========
+
+def main(arguments):
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('database', help="Arena database", nargs='?', default=None)
+    parser.add_argument('-r', '--rows', help="Number of arena rows to sample", default=1200, type=int)
+    args = parser.parse_args(arguments)
+
+    dbpath = args.database or config("DB_FILENAME")
+    if not os.path.exists(dbpath):
+        print("Database not found: " + dbpath)
+        return 1
+    arena = get_arena(dbpath, args.rows)
+    print("Arena sample: " + str(arena.shape[0]) + " rows x " + str(arena.shape[1]) + " cols")
+    print("{:<12}{:<7}{:>8}{:>14}{:>14}".format("codec", "block", "ratio", "encode ms", "decode ms"))
+    for kind, blocks in get_blocks(arena).items():
+        if not blocks:
+            continue # arena smaller than one chunk
+        for codec in CODECS:
+            ratio, encode_ms, decode_ms = bench(codec, blocks)
+            print("{:<12}{:<7}{:>8.2f}{:>14.3f}{:>14.3f}".format(codec, kind, ratio, encode_ms, decode_ms))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""
+    benchmark of the line of sight engine (scripts/Lineofsight.py):
+    random rays in an arena database, on the database cache (Dbcache) and on the
+    flat raster file (Mmcache, exported to a temporary file)
+    Usage:
+        benchLineofsight.py [database] [--rays N] [--length M] [--height M]
+            database: arena database (default config("DB_FILENAME"))
+            --rays: number of rays (default 10000)
+            --length: ray length in meters (default 5000)
+            --height: observer and target height above ground in meters (default 10)
+"""
+
+# packages ========
+import os
+import sys
+import time
+import math
+import argparse
+import tempfile
+import numpy as np
+from decouple import config
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from Dbcache import Dbcache, METERSPERDEGREE
+from Mmcache import Mmcache, export_raster
+from Lineofsight import Lineofsight
+
+# functions ========
+
+def get_rays(cache, count, length, height):
+    """
+    random rays of one length and random heading inside the arena
+    :return observers, targets: NumPy arrays (count x 3)
+    """
+    rng = np.random.default_rng(1)
+    bb = cache.bounding_box
+    lats = rng.uniform(bb["bottom"], bb["top"], count)
+    longs = rng.uniform(bb["left"], bb["right"], count)
+    headings = rng.uniform(0, 2*math.pi, count)
+    dlats = length*np.cos(headings)/METERSPERDEGREE
+    dlongs = length*np.sin(headings)/(METERSPERDEGREE*np.cos(np.radians(lats)))
+    heights = np.full(count, height, dtype=np.float64)
+    return np.column_stack((lats, longs, heights)), np.column_stack((lats + dlats, longs + dlongs, heights))
+
+def bench(cache, observers, targets):
+    """
+    check all rays with one call
+    :return (rays per second, number of visible rays)
+    """
+    start = time.perf_counter()
+    result = Lineofsight(cache).get_visibility(observers, targets)
+    elapsed = time.perf_counter() - start
+    return len(observers)/elapsed, int(np.count_nonzero(result["visible"]))
+
+# main ========
+
+def main(arguments):
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('database', help="Arena database", nargs='?', default=None)
+    parser.add_argument('-r', '--rays', help="Number of rays", default=10000, type=int)
+    parser.add_argument('-l', '--length', help="Ray length (meters)", default=5000, type=float)
+    parser.add_argument('--height', help="Height above ground (meters)", default=10, type=float)
+    args = parser.parse_args(arguments)
+
+    dbpath = args.database or config("DB_FILENAME")
+    if not os.path.exists(dbpath):
+        print("Database not found: " + dbpath)
+        return 1
+    print("{:<10}{:>12}{:>10}".format("cache", "rays/s", "visible"))
+    with tempfile.TemporaryDirectory() as folder:
+        rasterpath = os.path.join(folder, "arena.raster")
+        export_raster(dbpath, rasterpath)
+        for name, cache in (("Dbcache", Dbcache(dbpath)), ("Mmcache", Mmcache(rasterpath))):
+            with cache:
+                observers, targets = get_rays(cache, args.rays, args.length, args.height)
+                rate, visible = bench(cache, observers, targets)
+            print("{:<10}{:>12.0f}{:>10}".format(name, rate, visible))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""
+    stress benchmark of the read-only connection pool (scripts/Dbpool.py):
+    random point lookups on an arena database, with 1, 2, 4 ... threads
+    Usage:
+        benchPool.py [database] [--lookups N] [--threads N]
+            database: arena database (default config("DB_FILENAME"))
+            --lookups: lookups per thread (default 20000)
+            --threads: maximum number of threads (default 8)
+"""
+
+# packages ========
+import os
+import sys
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from decouple import config
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from Dbpool import Dbpool
+
+# functions ========
+
+def lookups(pool, count, seed):
+    """
+    random point lookups in the arena, in one thread
+    :return number of cells found
+    """
+    rng = random.Random(seed)
+    gt = pool.geotransform
+    rows, cols = pool.shape
+    found = 0
+    for _ in range(count):
+        lat = gt[3] + rng.random()*rows*gt[5]
+        long = gt[0] + rng.random()*cols*gt[1]
+        if pool.get_elevation(lat, long) >= 0:
+            found += 1
+    return found
+
+def bench(dbpath, threads, count):
+    """
+    run the lookups in threads, each thread with its own connection
+    :return lookups per second
+    """
+    with Dbpool(dbpath) as pool:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            start = time.perf_counter()
+            futures = [executor.submit(lookups, pool, count, seed) for seed in range(threads)]
+            found = sum(future.result() for future in futures)
+            elapsed = time.perf_counter() - start
+    if found != threads*count:
+        print("Lookups failed: " + str(threads*count - found))
+    return threads*count/elapsed
+
+# main ========
+
+def main(arguments):
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('database', help="Arena database", nargs='?', default=None)
+    parser.add_argument('-l', '--lookups', help="Lookups per thread", default=20000, type=int)
+    parser.add_argument('-t', '--threads', help="Maximum number of threads", default=8, type=int)
+    args = parser.parse_args(arguments)
+
+    dbpath = args.database or config("DB_FILENAME")
+    if not os.path.exists(dbpath):
+        print("Database not found: " + dbpath)
+        return 1
+    print("{:>8}{:>16}{:>10}".format("threads", "lookups/s", "scaling"))
+    threads = 1
+    single = None
+    while threads <= args.threads:
+        rate = bench(dbpath, threads, args.lookups)
+        single = single or rate
+        print("{:>8}{:>16.0f}{:>10.2f}".format(threads, rate, rate/single))
+        threads *= 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""
+    load generator for the elevation server (scripts/Dbserver.py):
+    concurrent clients send random elevation (or batch) requests,
+    reports the throughput and the p50/p99 latency
+    Usage:
+        loadServer.py [--port N | --socket PATH] [--clients N] [--requests N] [--batch N]
+            --clients: concurrent connections (default 32)
+            --requests: requests per client (default 500)
+            --batch: points per request, 1 is single point queries (default 1)
+"""
+
+# packages ========
+import sys
+import time
+import json
+import random
+import asyncio
+import argparse
+
+# constants ========
+HOST = "127.0.0.1"
+PORT = 8765
+
+# functions ========
+
+async def connect(args):
+    """
+    open one connection to the server
+    """
+    if args.socket:
+        return await asyncio.open_unix_connection(args.socket, limit=16*1024*1024)
+    return await asyncio.open_connection(HOST, args.port, limit=16*1024*1024)
+
+async def call(reader, writer, request):
+    """
+    send one request, wait for the response
+    """
+    writer.write(json.dumps(request).encode("utf-8") + b"\n")
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    if "error" in response:
+        raise ValueError(response["error"])
+    return response["result"]
+
+async def client(args, seed, bb, latencies):
+    """
+    one client: random points in the arena, one request at a time
+    """
+    rng = random.Random(seed)
+    reader, writer = await connect(args)
+    for idx in range(args.requests):
+        lats = [bb["bottom"] + rng.random()*(bb["top"] - bb["bottom"]) for _ in range(args.batch)]
+        longs = [bb["left"] + rng.random()*(bb["right"] - bb["left"]) for _ in range(args.batch)]
+        if args.batch == 1:
+            request = {"id": idx, "op": "elevation", "lat": lats[0], "long": longs[0]}
+        else:
+            request = {"id": idx, "op": "elevations", "lats": lats, "longs": longs}
+        start = time.perf_counter()
+        await call(reader, writer, request)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+async def run(args):
+    """
+    run all clients, print the report
+    """
+    reader, writer = await connect(args)
+    bb = (await call(reader, writer, {"id": 0, "op": "info"}))["bounding_box"]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, seed, bb, latencies) for seed in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    statistics = await call(reader, writer, {"id": 0, "op": "statistics"})
+    writer.close()
+    latencies.sort()
+    print("Requests: " + str(len(latencies)) + ", points per request: " + str(args.batch))
+    print("Throughput: {:.0f} requests/s".format(len(latencies)/elapsed))
+    print("Latency p50: {:.3f} ms, p99: {:.3f} ms".format(
+        1000*latencies[len(latencies)//2], 1000*latencies[int(len(latencies)*0.99)]))
+    print("Server: " + json.dumps(statistics))
+
+# main ========
+
+def main(arguments):
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-p', '--port', help="TCP port (localhost)", default=PORT, type=int)
+    parser.add_argument('-s', '--socket', help="Unix socket path (instead of TCP)", default=None)
+    parser.add_argument('-c', '--clients', help="Concurrent clients", default=32, type=int)
+    parser.add_argument('-r', '--requests', help="Requests per client", default=500, type=int)
+    parser.add_argument('-b', '--batch', help="Points per request", default=1, type=int)
+    args = parser.parse_args(arguments)
+    asyncio.run(run(args))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+"""
+    test the GeoTIFF reader (scripts/Geotiff.py) offline,
+    with small synthetic GeoTIFF files written by this script:
+        tiled, deflate + floating point predictor (like Copernicus COG)
+        tiled, LZW + horizontal predictor, int16
+        stripped, uncompressed, big endian
+"""
+
+# packages ========
+import os
+import sys
+import struct
+import tempfile
+import zlib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from Geotiff import Geotiff
+
+# constants ========
+EDGE = 1200 # resolution of the Copernicus GLO-90 DSM
+GEOTRANSFORM = (8.0, 1/EDGE, 0.0, 48.0, 0.0, -1/EDGE)
+
+# encoders ========
+
+def lzw_encode(data):
+    """
+    encode bytes with TIFF flavoured LZW (MSB first, 'early change')
+    """
+    codes = []
+    table = {bytes((i,)): i for i in range(256)}
+    nbits = 9
+    widths = []
+    codes.append(256); widths.append(nbits) # clear code
+    current = b""
+    for value in data:
+        candidate = current + bytes((value,))
+        if candidate in table:
+            current = candidate
+            continue
+        codes.append(table[current]); widths.append(nbits)
+        table[candidate] = len(table) + 2 # 256, 257 are reserved
+        next_code = len(table) + 2
+        if next_code == 4094:
+            codes.append(256); widths.append(nbits) # table full, clear
+            table = {bytes((i,)): i for i in range(256)}
+            nbits = 9
+        elif next_code >= (1 << nbits):
+            nbits += 1
+        current = bytes((value,))
+    if current:
+        codes.append(table[current]); widths.append(nbits)
+    codes.append(257); widths.append(nbits) # end of information
+    bits = 0
+    nbits_total = 0
+    for code, width in zip(codes, widths):
+        bits = (bits << width) | code
+        nbits_total += width
+    pad = (-nbits_total) % 8
+    return (bits << pad).to_bytes((nbits_total + pad) // 8, "big")
+
+def encode_block(block, compression, predictor, bo):
+    """
+    apply predictor and compression to one tile or strip
+    """
+    if predictor == 3:
+        rows, cols = block.shape
+        raw = block.astype(">" + block.dtype.str[1:]).view(np.uint8).reshape(rows, cols, -1)
+        raw = np.ascontiguousarray(raw.transpose(0, 2, 1)).reshape(rows, -1)
+        raw = np.diff(raw, axis=1, prepend=np.uint8(0)).astype(np.uint8).tobytes()
+    elif predictor == 2:
+        raw = np.diff(block, axis=1, prepend=block.dtype.type(0)).astype(bo + block.dtype.str[1:]).tobytes()
+    else:
+        raw = block.astype(bo + block.dtype.str[1:]).tobytes()
+    if compression == 8:
+        return zlib.compress(raw)
+    if compression == 5:
+        return lzw_encode(raw)
+    return raw
+
+def write_geotiff(filename, image, tile=None, compression=1, predictor=1, bo="<", rows_per_strip=None):
+    """
+    write a minimal GeoTIFF (PixelIsPoint, like Copernicus)
+    """
+    height, width = image.shape
+    blocks = []
+    if tile:
+        for top in range(0, height, tile):
+            for left in range(0, width, tile):
+                block = np.zeros((tile, tile), dtype=image.dtype)
+                part = image[top:top+tile, left:left+tile]
+                block[:part.shape[0], :part.shape[1]] = part
+                blocks.append(encode_block(block, compression, predictor, bo))
+    else:
+        for top in range(0, height, rows_per_strip):
+            blocks.append(encode_block(image[top:top+rows_per_strip], compression, predictor, bo))
+    fmt = {"f4": (3, 32), "i2": (2, 16), "u2": (1, 16)}[image.dtype.str[1:]]
+    # pixel is point: tiepoint is the center of the top left pixel
+    tiepoint = (0.0, 0.0, 0.0, GEOTRANSFORM[0]+GEOTRANSFORM[1]/2, GEOTRANSFORM[3]+GEOTRANSFORM[5]/2, 0.0)
+    scale = (GEOTRANSFORM[1], -GEOTRANSFORM[5], 0.0)
+    geokeys = (1, 1, 0, 2, 1024, 0, 1, 2, 1025, 0, 1, 2)
+    entries = [ # tag, type, values
+        (256, 4, (width,)), (257, 4, (height,)), (258, 3, (fmt[1],)), (259, 3, (compression,)),
+        (277, 3, (1,)), (317, 3, (predictor,)), (339, 3, (fmt[0],)),
+        (33550, 12, scale), (33922, 12, tiepoint), (34735, 3, geokeys), (42113, 2, b"-32767\0")
+    ]
+    if tile:
+        entries += [(322, 3, (tile,)), (323, 3, (tile,)), (324, 4, None), (325, 4, tuple(map(len, blocks)))]
+    else:
+        entries += [(273, 4, None), (278, 4, (rows_per_strip,)), (279, 4, tuple(map(len, blocks)))]
+    entries.sort()
+    # layout: header, block data, ifd, out of line values
+    data = bytearray(b"II*\0" if bo == "<" else b"MM\0*") + bytearray(4)
+    offsets = []
+    for block in blocks:
+        offsets.append(len(data))
+        data += block
+    codes = {3: "H", 4: "I", 12: "d"}
+    ifd = len(data)
+    struct.pack_into(bo + "I", data, 4, ifd)
+    extra = ifd + 2 + 12*len(entries) + 4
+    table = bytearray(struct.pack(bo + "H", len(entries)))
+    payload = bytearray()
+    for tag, typ, values in entries:
+        if values is None:
+            values = tuple(offsets)
+        raw = values if typ == 2 else struct.pack(bo + codes[typ]*len(values), *values)
+        count = len(values)
+        if len(raw) <= 4:
+            table += struct.pack(bo + "HHI", tag, typ, count) + raw.ljust(4, b"\0")
+        else:
+            table += struct.pack(bo + "HHII", tag, typ, count, extra + len(payload))
+            payload += raw
+    table += bytearray(4) # no next ifd
+    data += table + payload
+    with open(filename, "wb") as file:
+        file.write(data)
+
+# main ========
+
+def run_main():
+    rng = np.random.default_rng(1)
+    dem = (rng.random((EDGE, EDGE)) * 3000).astype(np.float32)
+    cases = [
+        ("tiled, deflate, floating point predictor", dem, dict(tile=256, compression=8, predictor=3)),
+        ("tiled, lzw, horizontal predictor, int16", dem[:300, :200].astype(np.int16), dict(tile=64, compression=5, predictor=2)),
+        ("stripped, uncompressed, big endian", dem.astype(np.int16), dict(rows_per_strip=7, bo=">"))
+    ]
+    test_ok = 0
+    test_nok = 0
+    with tempfile.TemporaryDirectory() as folder:
+        for name, image, options in cases:
+            filename = os.path.join(folder, "test.tif")
+            write_geotiff(filename, image, **options)
+            tif = Geotiff(filename)
+            same = np.array_equal(tif.read(), image)
+            same = same and np.allclose(tif.geotransform, GEOTRANSFORM) and tif.nodata == -32767
+            if same:
+                test_ok += 1
+            else:
+                test_nok += 1
+            print(name + ": " + ("OK" if same else "NOK"))
+    print("Test OK: "+str(test_ok)+", NOK: "+str(test_nok))
+    return 0 if test_nok == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(run_main())
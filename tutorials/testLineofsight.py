@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""
+    test the line of sight engine (scripts/Lineofsight.py) offline,
+    with a small synthetic arena written by this script (flat terrain, earth curvature off):
+        a wall of void cells (Raster.VOID) between observer and target does not obstruct
+        a ridge below sea level (-1 meters) obstructs a sight line lower than the ridge
+        an observer on a void cell stands at sea level
+    each case on the rows layout, the chunks layout (delta+zlib) and the flat raster (Mmcache)
+"""
+
+# packages ========
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from Dbsql import Dbsql, LAYOUT_ROWS, LAYOUT_CHUNKS
+from Raster import VOID
+from Codec import CODEC_RAW, CODEC_DELTA_ZLIB
+from Dbcache import Dbcache
+from Mmcache import Mmcache, export_raster
+from Lineofsight import Lineofsight
+
+# constants ========
+EDGE = 240 # rows and columns of the synthetic arena
+GEOTRANSFORM = (8.0, 1/1200, 0.0, 48.0, 0.0, -1/1200)
+
+# functions ========
+
+def get_terrain():
+    """
+    flat terrain at 100 meters, a void wall and a basin below sea level with a ridge
+    :return NumPy int16 array (EDGE x EDGE)
+    """
+    terrain = np.full((EDGE, EDGE), 100, dtype=np.int16)
+    terrain[110:131, 100:105] = VOID
+    terrain[200:231, 50:191] = -50 # basin
+    terrain[200:231, 120] = -1 # ridge, still below sea level
+    return terrain
+
+def write_arena(dbpath, terrain, layout, codec):
+    """
+    write the terrain to a new arena database
+    """
+    with Dbsql(dbpath, layout=layout, codec=codec) as sqldb:
+        rows = [row.astype(">i2").tobytes() for row in terrain]
+        with sqldb.transaction():
+            sqldb.put_rows(rows, 0, 0, 2*EDGE)
+            sqldb.put_geotransform(GEOTRANSFORM, 0, 0, EDGE, EDGE)
+
+def get_point(rowId, colId, height):
+    """
+    center of the cell (rowId, colId) with a height above ground
+    """
+    return (GEOTRANSFORM[3] + (rowId + 0.5)*GEOTRANSFORM[5], GEOTRANSFORM[0] + (colId + 0.5)*GEOTRANSFORM[1], height)
+
+# main ========
+
+def run_main():
+    cases = [ # name, observer, target, visible, obstructing colId
+        ("void wall", get_point(120, 20, 10), get_point(120, 220, 10), True, -1),
+        ("ridge below sea level", get_point(215, 60, 2), get_point(215, 180, 2), False, 120),
+        ("basin without ridge", get_point(215, 60, 2), get_point(215, 110, 2), True, -1),
+        ("observer on a void cell", get_point(120, 102, 150), get_point(120, 220, 50), True, -1)
+    ]
+    terrain = get_terrain()
+    test_ok = 0
+    test_nok = 0
+    with tempfile.TemporaryDirectory() as folder:
+        backends = []
+        for layout, codec in ((LAYOUT_ROWS, CODEC_RAW), (LAYOUT_CHUNKS, CODEC_DELTA_ZLIB)):
+            dbpath = os.path.join(folder, layout + ".db")
+            write_arena(dbpath, terrain, layout, codec)
+            backends.append((layout + ", " + codec, Dbcache(dbpath)))
+        rasterpath = os.path.join(folder, "arena.raster")
+        export_raster(os.path.join(folder, LAYOUT_ROWS + ".db"), rasterpath)
+        backends.append(("raster", Mmcache(rasterpath)))
+        for backend, cache in backends:
+            with cache:
+                result = Lineofsight(cache, curvature=False).get_visibility(
+                    [case[1] for case in cases], [case[2] for case in cases])
+            for idx, (name, observer, target, visible, colId) in enumerate(cases):
+                same = bool(result["visible"][idx]) == visible and int(result["colId"][idx]) == colId
+                if same:
+                    test_ok += 1
+                else:
+                    test_nok += 1
+                print(backend + ", " + name + ": " + ("OK" if same else "NOK"))
+    print("Test OK: "+str(test_ok)+", NOK: "+str(test_nok))
+    return 0 if test_nok == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(run_main())